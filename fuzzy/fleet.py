@@ -0,0 +1,234 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""fleet.py
+
+Drives many trucks from a single process, one for each connection to a
+truck server, such as the two ports of the jar or as many connections as
+wanted to `simulator.py`. The connections are served by asyncio, and the
+states they receive are gathered into a batch, which `infer` evaluates in
+a single pass: a tick of the whole fleet costs about as much as the rules
+for a single truck.
+
+A batch is evaluated once every truck still driving has sent its state, or
+once the first of them has waited for a while, so that a slow connection
+does not hold up the others for long.
+
+    $ python simulator.py &
+    $ python fleet.py --trucks 32
+"""
+
+from __future__ import absolute_import
+import asyncio
+from argparse import ArgumentParser
+from socket import IPPROTO_TCP, TCP_NODELAY
+from time import perf_counter
+
+from numpy import array
+
+from truck_driver import infer
+
+
+class Batcher:
+    """Steering for the states of many trucks, evaluated together."""
+
+    def __init__(self, active, inference=infer, linger=0.005):
+        """
+        Inits Batcher.
+
+        Args:
+            active:     number of trucks that send states.
+            inference:  function of arrays of positions along the X axis and
+                        angles of the trucks, as `infer`.
+            linger:     seconds the first state of a batch waits for the
+                        others.
+        """
+        self.active = active
+        self.inference = inference
+        self.linger = linger
+        self.states, self.waiting = [], []
+        self.timer = None
+        self.sizes = []
+
+    def flush(self):
+        """Evaluates the states gathered so far."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.states:
+            return
+
+        states, waiting = self.states, self.waiting
+        self.states, self.waiting = [], []
+        x_coords, angles = array(states).T
+        self.sizes.append(len(states))
+        for future, steer in zip(waiting, self.inference(x_coords, angles)):
+            if not future.done():
+                future.set_result(float(steer))
+
+    async def steer(self, x_coord, angle):
+        """
+        Waits for the steering of a truck, along with the others.
+
+        Args:
+            x_coord:    position of the truck along the X axis, in [0, 1].
+            angle:      angle of the truck, in degrees, as sent by the
+                        server.
+
+        Returns:
+            A number in the range [-1, 1] that turns the truck around.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.states.append((x_coord, angle))
+        self.waiting.append(future)
+
+        if len(self.states) >= self.active:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.linger, self.flush)
+        return await future
+
+    def leave(self):
+        """Stops waiting for a truck whose episode is over."""
+        self.active -= 1
+        if self.states and len(self.states) >= self.active:
+            self.flush()
+
+
+async def drive_connection(host, port, batcher, retries=10, backoff=0.1):
+    """
+    Drives a truck for an episode, sending each steering value along with
+    the request for the next state, as `truck_client.TruckClient` does.
+
+    Args:
+        host:       address of the server.
+        port:       port of the server.
+        batcher:    the Batcher shared by the trucks.
+        retries:    attempts at connecting before giving up.
+        backoff:    seconds waited after the first failed attempt, doubled
+                    after each of the next ones.
+
+    Returns:
+        A dictionary with the number of steps, the seconds the episode took
+        and the seconds waited for each state.
+    """
+    try:
+        for attempt in range(retries):
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                break
+            except OSError:
+                if attempt == retries - 1:
+                    raise
+                await asyncio.sleep(backoff * 2 ** attempt)
+        writer.get_extra_info("socket").setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+    except OSError:
+        batcher.leave()
+        raise
+
+    latencies = []
+    start = sent = perf_counter()
+    try:
+        writer.write(b"r\r\n")
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            latencies.append(perf_counter() - sent)
+            x_coord, _, angle = (float(i) for i in line.split())
+
+            steer = await batcher.steer(x_coord, angle)
+            writer.write("{!r}\r\nr\r\n".format(steer).encode())
+            sent = perf_counter()
+    except ConnectionError:
+        pass
+    finally:
+        batcher.leave()
+        writer.close()
+
+    return dict(
+        steps=len(latencies),
+        seconds=perf_counter() - start,
+        latencies=latencies,
+    )
+
+
+async def drive_fleet(host, ports, trucks, inference=infer, linger=0.005):
+    """
+    Drives a truck over each connection, all at the same time.
+
+    Args:
+        host:       address of the server.
+        ports:      ports of the server, each connected to by every truck.
+        trucks:     number of connections to each port.
+        inference:  as in `Batcher`.
+        linger:     as in `Batcher`.
+
+    Returns:
+        A tuple with the result of each connection, as in
+        `drive_connection`, or the exception it raised, and the Batcher.
+    """
+    addresses = [port for port in ports for _ in range(trucks)]
+    batcher = Batcher(len(addresses), inference, linger)
+    results = await asyncio.gather(
+        *(drive_connection(host, port, batcher) for port in addresses),
+        return_exceptions=True,
+    )
+    return results, batcher
+
+
+def main():
+    """Drives the fleet and sums up how fast each truck was driven."""
+    parser = ArgumentParser(description="Many fuzzy drivers at once.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ports", type=int, nargs="+", default=[4321])
+    parser.add_argument(
+        "--trucks", type=int, default=1, help="connections to each port"
+    )
+    parser.add_argument(
+        "--linger-ms",
+        type=float,
+        default=5.0,
+        help="time a state waits for the rest of its batch, in milliseconds",
+    )
+    args = parser.parse_args()
+
+    start = perf_counter()
+    results, batcher = asyncio.run(
+        drive_fleet(
+            args.host,
+            args.ports,
+            args.trucks,
+            linger=args.linger_ms / 1000,
+        )
+    )
+    elapsed = perf_counter() - start
+
+    for number, result in enumerate(results):
+        if isinstance(result, Exception):
+            print("truck {}: {}".format(number, result))
+            continue
+        latencies = sorted(result["latencies"]) or [0.0]
+        print(
+            "truck {}: {} steps, {:.0f} steps/s, latency median {:.2f} ms, "
+            "max {:.2f} ms".format(
+                number,
+                result["steps"],
+                result["steps"] / max(result["seconds"], 1e-9),
+                latencies[len(latencies) // 2] * 1e3,
+                latencies[-1] * 1e3,
+            )
+        )
+    if batcher.sizes:
+        print(
+            "{} batches in {:.3f} s, {:.1f} states each".format(
+                len(batcher.sizes),
+                elapsed,
+                sum(batcher.sizes) / len(batcher.sizes),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""harness.py
+
+Drives the truck of `simulator.py` from many starting positions, without
+sockets or windows, to compare sets of rules. The episodes are split among
+a pool of processes, and each of them drives its share of trucks together,
+evaluating the rules for all of them in a single pass at each step.
+
+An episode is a success when the truck reaches the bottom edge of the
+field close enough to the dock, at its middle, and facing down. The other
+sets of rules are the ones of `truck_driver.py` with a few more lines, as
+written in `rule_base.py`, such as fuzzy sets defined again:
+
+    $ python harness.py --episodes 5000
+    $ python harness.py --vary "define x is LO as 0.0 0.0 {}" 0.4 0.5 0.6
+"""
+
+from __future__ import absolute_import
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from time import perf_counter
+
+from numpy import array
+
+from rule_base import RuleBase
+from simulator import HEIGHT, WIDTH, Truck
+from truck_driver import RULES, STEER_CORNERS, VARIABLES, infer
+
+# rule bases kept by each worker process, one for each text
+RULE_BASES = {}
+
+
+def starting_states(count, seed=0):
+    """
+    Draws starting positions of the truck, in the upper part of the field,
+    facing anywhere.
+
+    Args:
+        count:  number of positions.
+        seed:   seed of the positions.
+
+    Returns:
+        List of tuples with the position along the X and Y axes, as
+        fractions of the field, and the angle, in degrees.
+    """
+    rng = Random(seed)
+    return [
+        (rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.5), rng.uniform(0, 360))
+        for _ in range(count)
+    ]
+
+
+def worker_drive(text, starts, step_size=1.0, sampled=False):
+    """
+    Drives trucks from starting positions, all of them at once, inside a
+    worker process.
+
+    Args:
+        text:       the rules, as in `RuleBase.parse`.
+        starts:     list of starting positions, as `starting_states`.
+        step_size:  fraction of a full step taken by the trucks.
+        sampled:    as in `truck_driver.infer`.
+
+    Returns:
+        A tuple with a list of the final position, angle and number of
+        steps of each truck, the seconds taken by the controller, and the
+        number of steps it decided.
+    """
+    if text not in RULE_BASES:
+        RULE_BASES[text] = RuleBase.parse(
+            text, VARIABLES, "steer", STEER_CORNERS
+        )
+    rule_base = RULE_BASES[text]
+
+    trucks = [Truck(x, y, angle, step_size) for x, y, angle in starts]
+    driving = [i for i in trucks if not i.done()]
+    seconds, decisions = 0.0, 0
+    while driving:
+        x_coords, _, angles = array([i.state() for i in driving]).T
+        start = perf_counter()
+        steer = infer(x_coords, angles, rule_base, sampled)
+        seconds += perf_counter() - start
+        decisions += len(driving)
+
+        for truck, value in zip(driving, steer.tolist()):
+            truck.step(value)
+        driving = [i for i in driving if not i.done()]
+
+    return [(i.x, i.y, i.angle, i.steps) for i in trucks], seconds, decisions
+
+
+def parked(x_coord, y_coord, angle, tolerance=(40, 10.0)):
+    """
+    Tells whether a truck ended its episode at the dock.
+
+    Args:
+        x_coord:    final position along the X axis, in pixels.
+        y_coord:    final position along the Y axis, in pixels.
+        angle:      final angle, in degrees.
+        tolerance:  tuple with the distance from the middle of the bottom
+                    edge, in pixels, and from facing down, in degrees,
+                    allowed.
+
+    Returns:
+        True if the truck is parked.
+    """
+    return (
+        y_coord > HEIGHT
+        and abs(x_coord - WIDTH // 2) <= tolerance[0]
+        and abs(angle - 90.0) <= tolerance[1]
+    )
+
+
+def run_harness(texts, starts, workers, chunk=250, **options):
+    """
+    Drives the trucks with each set of rules.
+
+    Args:
+        texts:      list with the text of each set of rules.
+        starts:     list of starting positions, as `starting_states`.
+        workers:    number of processes driving at the same time.
+        chunk:      number of trucks driven together by a process.
+        options:    keyword arguments of `worker_drive`, and the tolerance
+                    of `parked`.
+
+    Returns:
+        List with a dictionary for each set of rules, with its success
+        rate, the mean number of steps of the successes, the controller's
+        time for each step, in seconds, and the seconds it all took.
+    """
+    tolerance = options.pop("tolerance", (40, 10.0))
+    chunks = [starts[i : i + chunk] for i in range(0, len(starts), chunk)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        start = perf_counter()
+        futures = [
+            [executor.submit(worker_drive, i, j, **options) for j in chunks]
+            for i in texts
+        ]
+        for text_futures in futures:
+            finals, seconds, decisions = [], 0.0, 0
+            for future in text_futures:
+                chunk_finals, chunk_seconds, chunk_decisions = future.result()
+                finals.extend(chunk_finals)
+                seconds += chunk_seconds
+                decisions += chunk_decisions
+
+            steps = [i[3] for i in finals if parked(*i[:3], tolerance)]
+            results.append(
+                dict(
+                    success=len(steps) / max(1, len(finals)),
+                    steps=sum(steps) / max(1, len(steps)),
+                    step_seconds=seconds / max(1, decisions),
+                    elapsed=perf_counter() - start,
+                )
+            )
+    return results
+
+
+def main():
+    """Compares sets of rules, and prints a line for each of them."""
+    parser = ArgumentParser(description="Offline parking episodes.")
+    parser.add_argument(
+        "rules",
+        nargs="*",
+        help="files with lines added to the rules of truck_driver.py",
+    )
+    parser.add_argument(
+        "--vary",
+        nargs="+",
+        metavar=("TEMPLATE", "VALUE"),
+        help="a line added to the rules, with {} replaced by each value",
+    )
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the starting positions"
+    )
+    parser.add_argument(
+        "--step-size", type=float, default=1.0, help="fraction of each step"
+    )
+    parser.add_argument(
+        "--sampled",
+        action="store_true",
+        help="defuzzify over the points of INTENSITY instead of exactly",
+    )
+    parser.add_argument(
+        "--x-tolerance",
+        type=int,
+        default=40,
+        help="distance from the dock allowed, in pixels",
+    )
+    parser.add_argument(
+        "--angle-tolerance",
+        type=float,
+        default=10.0,
+        help="distance from facing down allowed, in degrees",
+    )
+    args = parser.parse_args()
+
+    names, texts = ["RULES"], [RULES]
+    for path in args.rules:
+        with open(path) as rules:
+            names.append(path)
+            texts.append(RULES + rules.read())
+    if args.vary:
+        for value in args.vary[1:]:
+            names.append(args.vary[0].format(value))
+            texts.append(RULES + args.vary[0].format(value))
+
+    # every set of rules is read before the workers start
+    for name, text in zip(names, texts):
+        try:
+            RuleBase.parse(text, VARIABLES, "steer", STEER_CORNERS)
+        except ValueError as error:
+            parser.error("{}: {}".format(name, error))
+
+    results = run_harness(
+        texts,
+        starting_states(args.episodes, args.seed),
+        args.workers,
+        step_size=args.step_size,
+        sampled=args.sampled,
+        tolerance=(args.x_tolerance, args.angle_tolerance),
+    )
+    for name, result in zip(names, results):
+        print(
+            "{}: {:.1%} parked in {:.1f} steps, {:.2f} us/step".format(
+                name,
+                result["success"],
+                result["steps"],
+                result["step_seconds"] * 1e6,
+            )
+        )
+    print(
+        "{} episodes each in {:.1f} s".format(
+            args.episodes, results[-1]["elapsed"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
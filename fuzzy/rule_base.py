@@ -0,0 +1,390 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""rule_base.py
+
+Fuzzy rules written as text, one for each line, and compiled once into
+arrays, so that evaluating them takes a fixed number of NumPy operations
+whatever the rules are:
+
+    x is LO and angle is WEAK_RIGHT then steer is LVL05
+
+Each rule fires with the smallest membership of its conditions (the AND of
+Mamdani [1]); a variable it does not mention does not restrict it. Rules
+sharing a consequent are grouped, and the consequent is clipped by the
+strongest of them, which is the same as clipping it by each one and taking
+the union. The fuzzy sets are given along with the text, or defined in it
+as triangles over the universe of their variable:
+
+    define x is LO as 0.0 0.0 0.5
+
+Blank lines, and anything after a "#", are ignored.
+
+When the sets of the output are triangles, whose corners are known, the
+aggregated set can be defuzzified exactly, rather than over the points of
+its universe: it is made of straight segments, which only bend at the
+corners, where a side is clipped, and where the sides of two triangles
+cross, so the centroid [2] is a sum over those segments.
+
+[1] https://en.wikipedia.org/wiki/Fuzzy_control_system
+[2] https://en.wikipedia.org/wiki/Centroid
+"""
+
+from __future__ import absolute_import
+
+from numpy import (
+    argsort,
+    array,
+    concatenate,
+    diff,
+    errstate,
+    eye,
+    finfo,
+    flatnonzero,
+    fmax,
+    fmin,
+    isfinite,
+    nonzero,
+    ones,
+    sort,
+    stack,
+    triu_indices,
+    unique,
+    zeros,
+)
+from skfuzzy import interp_membership, trimf
+
+
+class RuleBase:
+    """Rules compiled into index arrays over matrices of fuzzy sets."""
+
+    def __init__(self, variables, output, rules, triangles=None):
+        """
+        Inits RuleBase, compiling the rules.
+
+        Args:
+            variables:  dictionary with the universe and a dictionary of the
+                        membership of each fuzzy set, by name, of each
+                        variable; the inputs are taken in its order.
+            output:     name of the variable the rules conclude about.
+            rules:      list of rules, each a tuple with a dictionary of the
+                        set of each input it tests and the set of the
+                        output it concludes, all of them known.
+            triangles:  dictionary with the corners of the sets of the
+                        output that are triangles, by name, or None.
+        """
+        self.inputs = [i for i in variables if i != output]
+        self.universe = variables[output][0]
+        self.labels = {i: list(j[1]) for i, j in variables.items()}
+        self.universes = {i: variables[i][0] for i in self.inputs}
+
+        # a row of ones at the end of each matrix stands for "any set"
+        self.sets = {
+            i: stack(
+                [variables[i][1][j] for j in self.labels[i]]
+                + [ones(len(variables[i][0]))]
+            )
+            for i in self.inputs
+        }
+
+        antecedents, consequents = [], []
+        for tests, consequent in rules:
+            antecedents.append(
+                [
+                    (
+                        self.labels[i].index(tests[i])
+                        if i in tests
+                        else len(self.labels[i])
+                    )
+                    for i in self.inputs
+                ]
+            )
+            consequents.append(self.labels[output].index(consequent))
+
+        # the rules are sorted by consequent, to be reduced group by group
+        consequents = array(consequents, dtype=int)
+        order = argsort(consequents, kind="stable")
+        self.antecedents = array(antecedents, dtype=int).reshape(
+            len(rules), len(self.inputs)
+        )[order]
+        groups = consequents[order]
+        self.starts = flatnonzero(diff(groups, prepend=-1))
+        self.consequents = groups[self.starts]
+        self.outputs = stack(
+            [variables[output][1][i] for i in self.labels[output]]
+        )[self.consequents]
+
+        # consequents that are all triangles are defuzzified exactly
+        self.corners = self.breaks = None
+        labels = [self.labels[output][i] for i in self.consequents]
+        if triangles is not None and all(i in triangles for i in labels):
+            self.corners = array([sorted(triangles[i]) for i in labels])
+            self.breaks = triangle_breaks(self.corners)
+
+    @classmethod
+    def parse(cls, text, variables, output, triangles=None):
+        """
+        Reads rules, and definitions of sets, written as text.
+
+        Args:
+            text:       the rules, one for each line.
+            variables:  as in `__init__`; sets defined in the text are
+                        added to a copy of it.
+            output:     as in `__init__`.
+            triangles:  as in `__init__`; sets of the output defined in the
+                        text are added to a copy of it.
+
+        Returns:
+            A RuleBase.
+
+        Raises:
+            ValueError: if a line cannot be read, with its number.
+        """
+        variables = {i: (j[0], dict(j[1])) for i, j in variables.items()}
+        triangles = dict(triangles or {})
+        rules = []
+        for number, line in enumerate(text.splitlines(), 1):
+            words = line.split("#")[0].split()
+            if not words:
+                continue
+            try:
+                if words[0] == "define":
+                    name, label = words[1], words[3]
+                    if len(words) != 8 or words[2] != "is" or words[4] != "as":
+                        raise ValueError("expected define v is SET as a b c")
+                    corners = sorted(float(i) for i in words[5:])
+                    if name not in variables:
+                        raise ValueError("unknown variable " + name)
+                    variables[name][1][label] = trimf(
+                        variables[name][0], corners
+                    )
+                    if name == output:
+                        triangles[label] = corners
+                    continue
+
+                tests, (name, label) = parse_rule(words)
+                if name != output:
+                    raise ValueError("rules conclude about " + output)
+                for i, j in list(tests.items()) + [(name, label)]:
+                    if i not in variables or (i == output and i in tests):
+                        raise ValueError("unknown input " + i)
+                    if j not in variables[i][1]:
+                        raise ValueError("unknown set {} of {}".format(j, i))
+                rules.append((tests, label))
+            except (IndexError, ValueError) as error:
+                raise ValueError(
+                    "line {}: {} ({})".format(number, line.strip(), error)
+                ) from None
+        if not rules:
+            raise ValueError("no rules")
+        return cls(variables, output, rules, triangles)
+
+    def strengths(self, **values):
+        """
+        Evaluates the rules for many states at once.
+
+        Args:
+            values: a NumPy array with the value of each input for each
+                    state, by name.
+
+        Returns:
+            A matrix with the strength of each group of rules sharing a
+            consequent (columns), in the order of `consequents`, for each
+            state (rows).
+        """
+        degrees = []
+        for name in self.inputs:
+            universe, sets = self.universes[name], self.sets[name]
+            degrees.append(
+                stack(
+                    [
+                        interp_membership(universe, i, values[name])
+                        for i in sets
+                    ],
+                    axis=1,
+                )
+            )
+
+        # firing strength of each rule, then of each group of rules
+        firing = fmin.reduce(
+            [i[:, self.antecedents[:, j]] for j, i in enumerate(degrees)]
+        )
+        return fmax.reduceat(firing, self.starts, axis=1)
+
+    def evaluate(self, **values):
+        """
+        Evaluates the rules for many states at once, aggregating their
+        consequents over the universe of the output.
+
+        Args:
+            values: as in `strengths`.
+
+        Returns:
+            A matrix with the membership of each point of the universe of
+            the output (columns) after aggregating the rules, for each state
+            (rows).
+        """
+        strength = self.strengths(**values)
+        return fmax.reduce(
+            fmin(strength[:, :, None], self.outputs[None, :, :]), axis=1
+        )
+
+    def defuzzify(self, **values):
+        """
+        Evaluates the rules for many states at once, finding the exact
+        centroid of the aggregated set.
+
+        Args:
+            values: as in `strengths`.
+
+        Returns:
+            A NumPy array with the centroid for each state, or zero where no
+            rule fires.
+
+        Raises:
+            ValueError: if a consequent is not a triangle.
+        """
+        if self.corners is None:
+            raise ValueError("the consequents are not all triangles")
+        return triangle_centroid(
+            self.corners, self.strengths(**values), self.breaks
+        )
+
+
+def triangles_at(points, corners, heights):
+    """
+    Finds the membership of points to the union of clipped triangles.
+
+    Args:
+        points:     a matrix with points for each state (rows).
+        corners:    a matrix with the corners of each triangle (rows).
+        heights:    a matrix with the height each triangle (columns) is
+                    clipped at for each state (rows), at most one.
+
+    Returns:
+        A matrix with the membership of each point.
+    """
+    left, peak, right = corners.T[:, :, None, None]
+    tiny = finfo(float).tiny
+
+    # a vertical side rises at once, however close a point is to it
+    rising = (points - left) / fmax(peak - left, tiny)
+    falling = (right - points) / fmax(right - peak, tiny)
+    clipped = fmin(fmin(rising, falling), heights.T[:, :, None])
+    return fmax(fmax.reduce(clipped), 0.0)
+
+
+def triangle_breaks(corners):
+    """
+    Finds where the union of triangles may bend whatever their heights are,
+    at their corners and where their sides cross, and which of them may be
+    clipped at the height of another, as their supports overlap.
+
+    Args:
+        corners:    a matrix with the corners of each triangle (rows).
+
+    Returns:
+        A tuple with three NumPy arrays, such that the points are at
+        `base + rate * height`, for the height of the triangles `levels`:
+        the first of them, which do not depend on it, have no rate.
+    """
+    left, peak, right = corners.T
+    start, end = concatenate([left, peak]), concatenate([peak, right])
+    with errstate(divide="ignore", invalid="ignore"):
+        # each side as y = slope * x + offset, infinite if vertical
+        slope = concatenate([1 / (peak - left), -1 / (right - peak)])
+        offset = concatenate([-left / (peak - left), right / (right - peak)])
+        i, j = triu_indices(len(slope), 1)
+        crossings = (offset[j] - offset[i]) / (slope[i] - slope[j])
+
+    # sides only bend the union where both of them are
+    crossings = crossings[
+        isfinite(crossings)
+        & (crossings >= fmax(start[i], start[j]))
+        & (crossings <= fmin(end[i], end[j]))
+    ]
+    overlap = (left[:, None] < right) & (left < right[:, None])
+    sides, levels = nonzero(overlap | eye(len(corners), dtype=bool))
+    fixed = unique(concatenate([corners.ravel(), crossings]))
+    return (
+        concatenate([fixed, left[sides], right[sides]]),
+        concatenate(
+            [zeros(len(fixed)), (peak - left)[sides], (peak - right)[sides]]
+        ),
+        concatenate([zeros(len(fixed), dtype=int), levels, levels]),
+    )
+
+
+def triangle_centroid(corners, heights, breaks=None):
+    """
+    Defuzzifies the union of clipped triangles with the centroid method,
+    exactly, for many states at once.
+
+    Args:
+        corners:    a matrix with the corners of each triangle (rows).
+        heights:    a matrix with the height each triangle (columns) is
+                    clipped at for each state (rows), at most one.
+        breaks:     as returned by `triangle_breaks`, or None to find it.
+
+    Returns:
+        A NumPy array with the centroid for each state, or zero for an
+        empty union.
+    """
+    base, rate, levels = triangle_breaks(corners) if breaks is None else breaks
+
+    # where a side reaches the height it may be clipped at
+    points = sort(base + rate * heights[:, levels], axis=1)
+
+    # the union is straight between two points, and read a third of the
+    # way from each, as it may jump at a vertical side; for a straight
+    # segment, twice its area and moment are then simple sums
+    start, end = points[:, :-1], points[:, 1:]
+    inner = triangles_at(
+        concatenate([2 * start + end, start + 2 * end], axis=1) / 3,
+        corners,
+        heights,
+    )
+    first, second = inner[:, : start.shape[1]], inner[:, start.shape[1] :]
+    width = end - start
+    area = (width * (first + second)).sum(axis=1)
+    moment = (width * (start * first + end * second)).sum(axis=1)
+    return moment / fmax(area, finfo(float).eps)
+
+
+def parse_rule(words):
+    """
+    Reads a rule such as "x is LO and angle is WEAK_RIGHT then steer is
+    LVL05", which may also begin with "if".
+
+    Args:
+        words:  the words of the rule.
+
+    Returns:
+        A tuple with a dictionary of the set of each input the rule tests,
+        and a tuple with the variable and the set it concludes.
+
+    Raises:
+        ValueError: if the rule is not well formed.
+    """
+    if words[0] == "if":
+        words = words[1:]
+    if "then" not in words:
+        raise ValueError("expected then")
+    split = words.index("then")
+    conclusion = words[split + 1 :]
+    if len(conclusion) != 3 or conclusion[1] != "is":
+        raise ValueError("expected then v is SET")
+
+    tests = {}
+    conditions = words[:split]
+    for i in range(0, len(conditions), 4):
+        name, verb, label = conditions[i : i + 3]
+        joined = conditions[i + 3 : i + 4]
+        if verb != "is" or joined not in ([], ["and"]):
+            raise ValueError("expected v is SET and ...")
+        if joined and i + 4 >= len(conditions):
+            raise ValueError("expected a condition after and")
+        if name in tests:
+            raise ValueError("{} tested twice".format(name))
+        tests[name] = label
+    return tests, (conclusion[0], conclusion[2])
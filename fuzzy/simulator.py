@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""simulator.py
+
+A stand-in for `fuzzy_truck_contest.jar`, so that the driver can be tried
+without Java or its window. The truck moves as in the jar: on a field of
+800 by 480 pixels, with the Y axis pointing down to the dock at the middle
+of the bottom edge, it advances 20 pixels for each step and turns by up to
+30 degrees. Each connection drives a truck of its own, over the same line
+protocol:
+
+    r           answered with "x y angle", the position divided by the size
+                of the field, and the angle in degrees
+    steer       a number in the range [-1, 1], which moves the truck a step
+
+An episode ends, and the connection is closed, once the truck leaves the
+field or takes too many steps; the score is then printed as the jar does.
+
+    $ python simulator.py --port 4321
+    $ python truck_driver.py --port 4321
+"""
+
+from __future__ import absolute_import
+from argparse import ArgumentParser
+from math import cos, pi, sin
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+
+# size of the field, in pixels
+WIDTH, HEIGHT = 800, 480
+
+# how far the truck may leave the field, and for how long it is driven
+MARGIN = 200
+MAX_STEPS = 2000
+
+
+class Truck:
+    """A truck on the field, as `Truck` and `Driver` of the jar move it."""
+
+    def __init__(self, x=0.2, y=0.2, angle=30.0, step_size=1.0):
+        """
+        Inits Truck at its starting position, as typed in the jar's window.
+
+        Args:
+            x:          position along the X axis, as a fraction of the
+                        field's width.
+            y:          position along the Y axis, as a fraction of the
+                        field's height.
+            angle:      angle of the truck, in degrees.
+            step_size:  fraction of a full step taken at each command.
+        """
+        self.x, self.y = int(x * WIDTH), int(y * HEIGHT)
+        self.angle = angle
+        self.step_size = step_size
+        self.speed = 20.0 * step_size
+        self.max_turn = 30.0
+        self.steps = 0
+
+    def state(self):
+        """
+        Reads the state of the truck, as the server sends it.
+
+        Returns:
+            A tuple with the position along the X and Y axes, in [0, 1]
+            while on the field, and the angle, in degrees.
+        """
+        return self.x / WIDTH, self.y / HEIGHT, self.angle
+
+    def step(self, steer):
+        """
+        Moves the truck a step.
+
+        Args:
+            steer:  a number in the range [-1, 1] that turns the truck
+                    around; it is clipped to the range.
+        """
+        steer = min(max(steer, -1.0), 1.0) * self.step_size
+        heading = (self.angle - steer * self.max_turn) / 180 * pi
+
+        # the jar keeps the position in whole pixels
+        self.x = int(self.x - cos(heading) * self.speed)
+        self.y = int(self.y + sin(heading) * self.speed)
+        self.angle += steer * self.max_turn
+        if self.angle < 0:
+            self.angle += 360.0
+        elif self.angle > 360:
+            self.angle -= 360.0
+        self.steps += 1
+
+    def done(self):
+        """
+        Tells whether the episode is over.
+
+        Returns:
+            True if the truck has reached the bottom edge, gone too far off
+            the field, or taken too many steps.
+        """
+        return (
+            self.x > WIDTH + MARGIN
+            or self.y > HEIGHT
+            or self.x < -MARGIN
+            or self.y < -MARGIN
+            or self.steps > MAX_STEPS
+        )
+
+    def score(self):
+        """
+        Scores the episode as the jar does, penalizing the steps taken and
+        the distance to the dock, facing down, at the middle of the bottom
+        edge.
+
+        Returns:
+            The score, 10000 for a perfect parking in no steps.
+        """
+        return (
+            10000.0
+            - self.steps * self.step_size
+            - abs(self.x - WIDTH // 2)
+            - (HEIGHT - self.y)
+            - abs(90.0 - self.angle)
+        )
+
+
+class TruckHandler(StreamRequestHandler):
+    """Drives a truck over a connection, for a single episode."""
+
+    def handle(self):
+        truck = Truck(*self.server.start)
+        while not truck.done():
+            line = self.rfile.readline()
+            if not line:
+                break
+            if b"r" in line:
+                self.wfile.write(
+                    "{!r}\t{!r}\t{!r}\r\n".format(*truck.state()).encode()
+                )
+            elif line.strip():
+                truck.step(float(line))
+
+        print(
+            "Final X, Y: {}, {}\nFinal angle: {}\nSteps used: {}".format(
+                truck.x, truck.y, truck.angle, truck.steps
+            )
+        )
+        print("Score is: {}".format(truck.score()))
+
+
+class Simulator(ThreadingTCPServer):
+    """Server with a truck for each connection."""
+
+    allow_reuse_address = True
+    request_queue_size = 128
+    daemon_threads = True
+
+    def __init__(self, address, start=(0.2, 0.2, 30.0, 1.0)):
+        """
+        Inits Simulator, listening on an address.
+
+        Args:
+            address:    tuple with the host and the port.
+            start:      the arguments of each Truck.
+        """
+        super().__init__(address, TruckHandler)
+        self.start = start
+
+
+def main():
+    """Serves trucks until interrupted."""
+    parser = ArgumentParser(description="Truck simulator over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4321)
+    parser.add_argument(
+        "--x", type=float, default=0.2, help="starting position, in [0, 1]"
+    )
+    parser.add_argument(
+        "--y", type=float, default=0.2, help="starting position, in [0, 1]"
+    )
+    parser.add_argument(
+        "--angle", type=float, default=30.0, help="starting angle, in degrees"
+    )
+    parser.add_argument(
+        "--step-size", type=float, default=1.0, help="fraction of each step"
+    )
+    args = parser.parse_args()
+
+    start = (args.x, args.y, args.angle, args.step_size)
+    with Simulator((args.host, args.port), start) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""steering_table.py
+
+The fuzzy controller only looks at the position of the truck along the X
+axis, in [0, 1], and at its angle, which `normalize_angle` turns into a
+whole number of degrees in [-180, 180). It is then a function of two
+variables, which can be sampled once over a grid and saved, so that driving
+takes a bilinear interpolation [1] between the four samples around a state
+instead of evaluating every rule.
+
+    $ python steering_table.py compile table.npz
+    $ python steering_table.py report table.npz
+    $ python truck_driver.py --table table.npz
+
+[1] https://en.wikipedia.org/wiki/Bilinear_interpolation
+"""
+
+from __future__ import absolute_import
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from numpy import arange, linspace, load, meshgrid, savez
+
+from truck_driver import fuzzy_steer, infer, normalize_angle
+
+# whole angles, after normalizing, that the table is sampled at
+ANGLES = (-180, 180)
+
+
+class SteeringTable:
+    """The controller, sampled over a grid of states."""
+
+    def __init__(self, steer, x_grid, angle_grid):
+        """
+        Inits SteeringTable with its samples.
+
+        Args:
+            steer:      a matrix with the steering for each position along
+                        the X axis (rows) and each angle (columns).
+            x_grid:     the positions the rows were sampled at, evenly
+                        spaced.
+            angle_grid: the angles the columns were sampled at, one degree
+                        apart.
+        """
+        self.steer = steer
+        self.x_grid, self.angle_grid = x_grid, angle_grid
+        self.x_first, self.angle_first = float(x_grid[0]), int(angle_grid[0])
+        self.x_step = float(x_grid[1] - x_grid[0])
+        self.x_last, self.angle_last = len(x_grid) - 2, len(angle_grid) - 2
+
+        # plain lists are read faster than arrays, one number at a time
+        self.rows = steer.tolist()
+
+    @classmethod
+    def compile(cls, x_steps=201, inference=infer):
+        """
+        Samples the controller over every whole angle and evenly spaced
+        positions along the X axis, all of them at once.
+
+        Args:
+            x_steps:    number of positions sampled in [0, 1]; 201 samples
+                        every 0.005, which keeps the corners of the fuzzy
+                        sets of the position.
+            inference:  function of arrays of positions along the X axis and
+                        angles of the trucks, as `infer`.
+
+        Returns:
+            A SteeringTable.
+        """
+        x_grid = linspace(0.0, 1.0, x_steps)
+        angle_grid = arange(ANGLES[0], ANGLES[1] + 1)
+
+        # angles as sent by the server, which `normalize_angle` turns back
+        x_coords, angles = meshgrid(x_grid, angle_grid + 90, indexing="ij")
+        steer = inference(x_coords.ravel(), angles.ravel())
+        return cls(steer.reshape(x_coords.shape), x_grid, angle_grid)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a table saved by `save`.
+
+        Args:
+            path:   the file with the table.
+
+        Returns:
+            A SteeringTable.
+        """
+        with load(path) as data:
+            return cls(data["steer"], data["x"], data["angle"])
+
+    def save(self, path):
+        """
+        Writes the table to a NumPy file.
+
+        Args:
+            path:   the file to write to, whose name should end in ".npz".
+        """
+        savez(path, steer=self.steer, x=self.x_grid, angle=self.angle_grid)
+
+    def __call__(self, x_coord, angle):
+        """
+        Interpolates the steering for a state of the truck.
+
+        Args:
+            x_coord:    position of the truck along the X axis; it is kept
+                        within the table.
+            angle:      angle of the truck, in degrees, as sent by the
+                        server.
+
+        Returns:
+            A number in the range [-1, 1] that turns the truck around.
+        """
+        row = (x_coord - self.x_first) / self.x_step
+        column = normalize_angle(angle) - self.angle_first
+        i = min(max(int(row), 0), self.x_last)
+        j = min(max(int(column), 0), self.angle_last)
+        x_weight = min(max(row - i, 0.0), 1.0)
+        angle_weight = min(max(column - j, 0.0), 1.0)
+
+        top, bottom = self.rows[i], self.rows[i + 1]
+        upper = top[j] + (top[j + 1] - top[j]) * angle_weight
+        lower = bottom[j] + (bottom[j + 1] - bottom[j]) * angle_weight
+        return upper + (lower - upper) * x_weight
+
+
+def report(table, controller=fuzzy_steer, samples=10000, seed=0):
+    """
+    Compares a table with the controller it was compiled from, over random
+    states of the truck.
+
+    Args:
+        table:      a SteeringTable.
+        controller: the function of a single state that the table stands
+                    for.
+        samples:    number of states compared.
+        seed:       seed of the random states.
+
+    Returns:
+        A string with the errors of the table, and the time each of them
+        takes to steer.
+    """
+    rng = Random(seed)
+    states = [
+        (rng.random(), rng.uniform(-360.0, 360.0)) for _ in range(samples)
+    ]
+
+    start = perf_counter()
+    exact = [controller(x, angle) for x, angle in states]
+    live = (perf_counter() - start) / samples
+    start = perf_counter()
+    looked_up = [table(x, angle) for x, angle in states]
+    lookup = (perf_counter() - start) / samples
+
+    errors = sorted(abs(i - j) for i, j in zip(exact, looked_up))
+    return "\n".join(
+        [
+            "{} states, {} x {} samples".format(
+                samples, len(table.x_grid), len(table.angle_grid)
+            ),
+            "error: mean {:.2e}, 99th percentile {:.2e}, max {:.2e}".format(
+                sum(errors) / samples,
+                errors[int(samples * 0.99)],
+                errors[-1],
+            ),
+            "time per step: rules {:.1f} us, table {:.2f} us ({:.0f}x)".format(
+                live * 1e6, lookup * 1e6, live / lookup
+            ),
+        ]
+    )
+
+
+def main():
+    """Compiles a table, or reports on one."""
+    parser = ArgumentParser(description="Fuzzy controller as a table.")
+    parser.add_argument("action", choices=("compile", "report"))
+    parser.add_argument("path", help="file of the table, ending in .npz")
+    parser.add_argument(
+        "--x-steps",
+        type=int,
+        default=201,
+        help="positions along the X axis sampled when compiling",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=10000, help="states compared"
+    )
+    args = parser.parse_args()
+
+    if args.action == "compile":
+        table = SteeringTable.compile(x_steps=args.x_steps)
+        table.save(args.path)
+    else:
+        table = SteeringTable.load(args.path)
+    print(report(table, samples=args.samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""truck_client.py
+
+Connection to the truck server, which answers "r" with the state of the
+truck and moves it a step for each steering value. The server reads the
+commands in order, so the request for the next state may follow the
+steering in the same write, as in HTTP pipelining [1]: each step then
+takes a single packet and a single round trip, which small writes sent one
+after the other would not, as Nagle's algorithm [2] holds the second one
+until the first is acknowledged.
+
+The connection is retried with exponential backoff, since the server only
+listens once the simulation is started, and it is closed by the server at
+the end of an episode.
+
+[1] https://en.wikipedia.org/wiki/HTTP_pipelining
+[2] https://en.wikipedia.org/wiki/Nagle%27s_algorithm
+"""
+
+from __future__ import absolute_import
+from socket import IPPROTO_TCP, TCP_NODELAY, create_connection
+from time import perf_counter, sleep
+
+
+class TruckClient:
+    """A connection to the truck server, driving one episode at a time."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=4321,
+        retries=10,
+        backoff=0.1,
+        pipeline=True,
+    ):
+        """
+        Inits TruckClient, without connecting.
+
+        Args:
+            host:       address of the server.
+            port:       port of the server.
+            retries:    attempts at connecting before giving up.
+            backoff:    seconds waited after the first failed attempt,
+                        doubled after each of the next ones, up to 5
+                        seconds.
+            pipeline:   whether to ask for the next state along with each
+                        steering value, or in a write of its own.
+        """
+        self.host, self.port = host, port
+        self.retries, self.backoff = retries, backoff
+        self.pipeline = pipeline
+        self.sock = self.reader = None
+
+        # seconds waited for each state, and taken by the controller
+        self.latencies, self.thinking = [], []
+
+    def connect(self):
+        """
+        Connects to the server, waiting for it to listen.
+
+        Raises:
+            ConnectionError: if the server could not be reached after all
+                             the attempts.
+        """
+        wait = self.backoff
+        for attempt in range(self.retries):
+            try:
+                self.sock = create_connection((self.host, self.port))
+                break
+            except OSError:
+                if attempt == self.retries - 1:
+                    raise ConnectionError(
+                        "no truck server at {}:{}".format(self.host, self.port)
+                    ) from None
+                sleep(wait)
+                wait = min(wait * 2, 5.0)
+
+        self.sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self):
+        """Closes the connection, if open."""
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+            self.sock = self.reader = None
+
+    def drive(self, controller):
+        """
+        Drives the truck for an episode, until the server closes the
+        connection.
+
+        Args:
+            controller: function of the position along the X axis and the
+                        angle of the truck that answers with the steering.
+
+        Returns:
+            The number of steps taken.
+        """
+        if self.sock is None:
+            self.connect()
+        sock, steps = self.sock, 0
+
+        try:
+            sock.sendall(b"r\r\n")
+            sent = perf_counter()
+            while True:
+                line = self.reader.readline()
+                received = perf_counter()
+                if not line.strip():
+                    break
+                x_coord, _, angle = (float(i) for i in line.split())
+                steer = float(controller(x_coord, angle))
+                thought = perf_counter()
+                self.latencies.append(received - sent)
+                self.thinking.append(thought - received)
+
+                command = "{!r}\r\n".format(steer).encode()
+                if self.pipeline:
+                    sock.sendall(command + b"r\r\n")
+                else:
+                    sock.sendall(command)
+                    sock.sendall(b"r\r\n")
+                sent = perf_counter()
+                steps += 1
+        except ConnectionError:
+            # the server may close before reading the last request
+            pass
+        finally:
+            self.close()
+        return steps
+
+    def report(self):
+        """
+        Sums up the timing of the steps driven so far.
+
+        Returns:
+            A string with the mean, median and maximum time waited for the
+            server and taken by the controller, for each step.
+        """
+        lines = ["{} steps".format(len(self.latencies))]
+        for name, seconds in (
+            ("server", self.latencies),
+            ("controller", self.thinking),
+        ):
+            if seconds:
+                seconds = sorted(seconds)
+                lines.append(
+                    "{}: mean {:.1f} us, median {:.1f} us, max {:.1f} us"
+                    "".format(
+                        name,
+                        sum(seconds) / len(seconds) * 1e6,
+                        seconds[len(seconds) // 2] * 1e6,
+                        seconds[-1] * 1e6,
+                    )
+                )
+        return "\n".join(lines)
@@ -7,40 +7,120 @@ A fuzzy driver for a virtual truck. Run `java -jar fuzzy_truck_contest.jar`
 and click "Iniciar/Reiniciar" to start the socket. Then, run this program
 and it will try its best to park the truck.
 
-    * `skfuzzy.defuzz` is the defuzzification function,
-        using the centroid method;
-    * `skfuzzy.interp_membership` finds the degree of membership
-        for a given variable using linear interpolation;
+    * `rule_base.triangle_centroid` is the defuzzification function,
+        using the centroid method exactly on triangles, and `centroid`
+        the one sampling them, as `skfuzzy.defuzz` does;
+    * `rule_base.RuleBase` evaluates the rules, compiled from `RULES`;
     * `skfuzzy.trimf` is the triangular membership function generator.
-    * Information about the `socket` parameters can be found here [1].
+    * `truck_client.TruckClient` keeps the connection to the server.
 
-[1] http://man7.org/linux/man-pages/man2/socket.2.html
+The driver may also be tried against `simulator.py`, which moves the truck
+as the jar does, without its window:
+
+    $ python simulator.py &
+    $ python truck_driver.py --episodes 3
 """
 
 from __future__ import absolute_import
+from argparse import ArgumentParser
+from functools import partial
 from math import floor
-from socket import socket, AF_INET, SOCK_STREAM
-from sys import argv
-
-import matplotlib.pyplot as plt
-from numpy import arange, fmin, fmax
-from skfuzzy import defuzz, interp_membership, trimf
-
 
-def _min(_list):
-    """
-    Shorter way of minimizing variables and vectors.
-
-    Args:
-        _list:  a list with floating point numbers and a vector as its last
-                member. Within this context, these are informations about the
-                truck and how much it should turn.
+from numpy import arange, array, asarray, finfo, fmax
+from numpy import floor as npfloor
+from skfuzzy import trimf
+
+from rule_base import RuleBase
+from truck_client import TruckClient
+
+# limitations from the server
+X_DIST = arange(0, 1.1, 0.1)
+Y_DIST = arange(0, 1.1, 0.1)
+ANGLE_RANGE = arange(-361, 361, 1)
+
+# the step value for this range can be customized
+INTENSITY = arange(-1, 1, 0.25)
+
+# position along the X axis
+X_LO = trimf(X_DIST, [0.0, 0.0, 0.5])
+X_MD = trimf(X_DIST, [0.2, 0.5, 0.8])
+X_HI = trimf(X_DIST, [0.5, 1.0, 1.0])
+
+# angle of truck
+A_STRG_RIGHT = trimf(ANGLE_RANGE, [10, 360, 360])
+A_WEAK_RIGHT = trimf(ANGLE_RANGE, [0, 15, 30])
+A_STRAIGHT = trimf(ANGLE_RANGE, [-5, 0, 5])
+A_WEAK_LEFT = trimf(ANGLE_RANGE, [-30, -15, 0])
+A_STRG_LEFT = trimf(ANGLE_RANGE, [-360, -360, -10])
+
+# level of steering (lower level means steering to the left), as the
+# corners of triangles
+STEER_CORNERS = {
+    "LVL01": [-1.0, -1.0, -0.5],
+    "LVL02": [-0.8, -0.3, 0.0],
+    "LVL03": [-0.2, 0.0, 0.2],
+    "LVL04": [-0.1, 0.0, 0.1],
+    "LVL05": [0.0, 0.3, 0.8],
+    "LVL06": [0.5, 1.0, 1.0],
+}
+STEER_LVL01 = trimf(INTENSITY, STEER_CORNERS["LVL01"])
+STEER_LVL02 = trimf(INTENSITY, STEER_CORNERS["LVL02"])
+STEER_LVL04 = trimf(INTENSITY, STEER_CORNERS["LVL04"])
+STEER_LVL03 = trimf(INTENSITY, STEER_CORNERS["LVL03"])
+STEER_LVL05 = trimf(INTENSITY, STEER_CORNERS["LVL05"])
+STEER_LVL06 = trimf(INTENSITY, STEER_CORNERS["LVL06"])
+
+VARIABLES = {
+    "x": (X_DIST, {"LO": X_LO, "MD": X_MD, "HI": X_HI}),
+    "angle": (
+        ANGLE_RANGE,
+        {
+            "STRG_RIGHT": A_STRG_RIGHT,
+            "WEAK_RIGHT": A_WEAK_RIGHT,
+            "STRAIGHT": A_STRAIGHT,
+            "WEAK_LEFT": A_WEAK_LEFT,
+            "STRG_LEFT": A_STRG_LEFT,
+        },
+    ),
+    "steer": (
+        INTENSITY,
+        {
+            "LVL01": STEER_LVL01,
+            "LVL02": STEER_LVL02,
+            "LVL03": STEER_LVL03,
+            "LVL04": STEER_LVL04,
+            "LVL05": STEER_LVL05,
+            "LVL06": STEER_LVL06,
+        },
+    ),
+}
+
+RULES = """
+x is LO and angle is STRG_LEFT then steer is LVL06
+x is LO and angle is WEAK_LEFT then steer is LVL06
+x is LO and angle is STRAIGHT then steer is LVL06
+x is LO and angle is STRG_RIGHT then steer is LVL06
+x is MD and angle is STRG_LEFT then steer is LVL06
+
+x is LO and angle is WEAK_RIGHT then steer is LVL05
+x is MD and angle is WEAK_LEFT then steer is LVL05
+
+x is LO and angle is STRG_RIGHT then steer is LVL04
+x is MD and angle is STRAIGHT then steer is LVL04
+x is HI and angle is STRG_LEFT then steer is LVL04
+
+x is MD and angle is WEAK_RIGHT then steer is LVL02
+x is HI and angle is WEAK_LEFT then steer is LVL02
+
+x is MD and angle is STRG_RIGHT then steer is LVL01
+x is HI and angle is STRAIGHT then steer is LVL01
+x is HI and angle is WEAK_RIGHT then steer is LVL01
+x is HI and angle is STRG_LEFT then steer is LVL01
+x is HI and angle is STRG_RIGHT then steer is LVL01
+"""
 
-    Returns:
-        A NumPy array with the smallest numbers between the first arguments
-        and the vector coordinate it is being compared to.
-    """
-    return fmin(fmin.reduce(_list[:-1]), _list[-1])
+# compiled once, when the module is loaded
+RULE_BASE = RuleBase.parse(RULES, VARIABLES, "steer", STEER_CORNERS)
 
 
 def normalize_angle(angle):
@@ -58,6 +138,9 @@ def normalize_angle(angle):
 
 def plot_fuzzy_sets():
     """Shows the fuzzy sets constructed below in pretty colors."""
+    # only needed here, and slow to load in every process driving a truck
+    import matplotlib.pyplot as plt  # pylint: disable=C0415
+
     _, (ax0, ax1, ax2) = plt.subplots(nrows=3, figsize=(8, 9))
 
     ax0.plot(X_DIST, X_LO, "b", linewidth=1.5, label="Left")
@@ -93,107 +176,165 @@ def plot_fuzzy_sets():
     plt.show()
 
 
-def drive_truck():
+def normalize_angles(angles):
+    """
+    Shifts the truck to the right, as `normalize_angle` does, for many
+    angles at once.
+
+    Args:
+        angles: a NumPy array with the numbers to be normalized.
+
+    Returns:
+        A NumPy array with the normalized numbers.
+    """
+    return npfloor(((angles + 90) % 360.0) - 180.0)
+
+
+def centroid(universe, memberships):
     """
-    Connects to a server that provides a truck to be driven; sends a message
-    to the server asking for data, and then processes it according to the
-    membership functions. Finally, a reply is sent containing a number in
-    the range [-1, 1] that turns the truck around.
+    Defuzzifies many fuzzy sets at once with the centroid method, taking the
+    membership as linear between the points of the universe, as
+    `skfuzzy.defuzz` does for a single set.
+
+    Args:
+        universe:       a vector with the points of the universe.
+        memberships:    a matrix with the membership of each point (columns)
+                        to each set (rows).
+
+    Returns:
+        A NumPy array with the centroid of each set, or zero for an empty
+        one.
+    """
+    left, right = universe[:-1], universe[1:]
+    low, high = memberships[:, :-1], memberships[:, 1:]
+    width = right - left
+
+    # area and moment of the trapezoid between each pair of points
+    area = (width * (low + high)).sum(axis=1) / 2
+    moment = (
+        width * (left * (2 * low + high) + right * (low + 2 * high))
+    ).sum(axis=1) / 6
+    return moment / fmax(area, finfo(float).eps)
+
+
+def infer(x_coords, angles, rule_base=None, sampled=False):
+    """
+    Evaluates the rules of the controller for many states of the truck in a
+    single pass. The steering is the exact centroid of the triangles of the
+    levels of steering, unless sampled over `INTENSITY`.
+
+    Args:
+        x_coords:   a NumPy array with the positions of the trucks along the
+                    X axis, in [0, 1].
+        angles:     a NumPy array with the angles of the trucks, in degrees,
+                    as sent by the server.
+        rule_base:  the RuleBase evaluated, or None for `RULE_BASE`.
+        sampled:    whether to defuzzify over the points of the universe of
+                    the output, as `skfuzzy.defuzz` does, even if the levels
+                    of steering are all triangles.
+
+    Returns:
+        A NumPy array with a number in the range [-1, 1] for each state,
+        which turns its truck around.
+    """
+    rule_base = RULE_BASE if rule_base is None else rule_base
+    values = dict(
+        x=asarray(x_coords, dtype=float),
+        angle=normalize_angles(asarray(angles, dtype=float)),
+    )
+    if rule_base.corners is None or sampled:
+        return centroid(rule_base.universe, rule_base.evaluate(**values))
+    return rule_base.defuzzify(**values)
+
+
+def fuzzy_steer(x_coord, angle, rule_base=None):
+    """
+    Evaluates the rules of the controller for a state of the truck.
+
+    Args:
+        x_coord:    position of the truck along the X axis, in [0, 1].
+        angle:      angle of the truck, in degrees, as sent by the server.
+        rule_base:  as in `infer`.
+
+    Returns:
+        A number in the range [-1, 1] that turns the truck around.
+    """
+    return float(infer(array([x_coord]), array([angle]), rule_base)[0])
+
+
+def drive_truck(controller=fuzzy_steer, client=None, episodes=1):
+    """
+    Connects to a server that provides a truck to be driven; asks the server
+    for data, and then processes it according to the membership functions.
+    Finally, a reply is sent containing a number in the range [-1, 1] that
+    turns the truck around, along with the request for the next data.
+
+    Args:
+        controller: function of the position along the X axis and the angle
+                    of the truck that answers with the steering, such as
+                    `fuzzy_steer` or a `SteeringTable`.
+        client:     the TruckClient connecting to the server, or None for
+                    the default one.
+        episodes:   number of episodes driven, each on a new connection.
+
+    Returns:
+        The TruckClient, with the timing of every step.
     """
-    sckt = socket(AF_INET, SOCK_STREAM)
-    sckt.connect(("127.0.0.1", 4321))
-    server = sckt.makefile()
-
-    while True:
-        sckt.send("r\r\n".encode())
-        msg = server.readline().split()
-
-        if msg:
-            x_coord, _, angle = tuple(map(float, msg))
-        else:
-            break
-
-        rot = normalize_angle(angle)
-
-        x_lvl_lo = interp_membership(X_DIST, X_LO, x_coord)
-        x_lvl_md = interp_membership(X_DIST, X_MD, x_coord)
-        x_lvl_hi = interp_membership(X_DIST, X_HI, x_coord)
-
-        drive_to = {
-            "strg_right": interp_membership(ANGLE_RANGE, A_STRG_RIGHT, rot),
-            "weak_right": interp_membership(ANGLE_RANGE, A_WEAK_RIGHT, rot),
-            "straight": interp_membership(ANGLE_RANGE, A_STRAIGHT, rot),
-            "weak_left": interp_membership(ANGLE_RANGE, A_WEAK_LEFT, rot),
-            "strg_left": interp_membership(ANGLE_RANGE, A_STRG_LEFT, rot),
-        }
-
-        rules = [
-            [
-                [x_lvl_lo, drive_to["strg_left"], STEER_LVL06],
-                [x_lvl_lo, drive_to["weak_left"], STEER_LVL06],
-                [x_lvl_lo, drive_to["straight"], STEER_LVL06],
-                [x_lvl_lo, drive_to["strg_right"], STEER_LVL06],
-                [x_lvl_md, drive_to["strg_left"], STEER_LVL06],
-            ],
-            [
-                [x_lvl_lo, drive_to["weak_right"], STEER_LVL05],
-                [x_lvl_md, drive_to["weak_left"], STEER_LVL05],
-            ],
-            [
-                [x_lvl_lo, drive_to["strg_right"], STEER_LVL04],
-                [x_lvl_md, drive_to["straight"], STEER_LVL04],
-                [x_lvl_hi, drive_to["strg_left"], STEER_LVL04],
-            ],
-            [
-                [x_lvl_md, drive_to["weak_right"], STEER_LVL02],
-                [x_lvl_hi, drive_to["weak_left"], STEER_LVL02],
-            ],
-            [
-                [x_lvl_md, drive_to["strg_right"], STEER_LVL01],
-                [x_lvl_hi, drive_to["straight"], STEER_LVL01],
-                [x_lvl_hi, drive_to["weak_right"], STEER_LVL01],
-                [x_lvl_hi, drive_to["strg_left"], STEER_LVL01],
-                [x_lvl_hi, drive_to["strg_right"], STEER_LVL01],
-            ],
-        ]
-
-        aggregated = [fmax.reduce(list(map(_min, i))) for i in rules]
-        steer_value = defuzz(INTENSITY, fmax.reduce(aggregated), "centroid")
-        sckt.send((str(steer_value) + "\r\n").encode())
-
-    sckt.close()
+    client = TruckClient() if client is None else client
+    for _ in range(episodes):
+        client.drive(controller)
+    return client
 
 
 if __name__ == "__main__":
-    # limitations from the server
-    X_DIST = arange(0, 1.1, 0.1)
-    Y_DIST = arange(0, 1.1, 0.1)
-    ANGLE_RANGE = arange(-361, 361, 1)
-
-    # the step value for this range can be customized
-    INTENSITY = arange(-1, 1, 0.25)
-
-    # position along the X axis
-    X_LO = trimf(X_DIST, [0.0, 0.0, 0.5])
-    X_MD = trimf(X_DIST, [0.2, 0.5, 0.8])
-    X_HI = trimf(X_DIST, [0.5, 1.0, 1.0])
-
-    # angle of truck
-    A_STRG_RIGHT = trimf(ANGLE_RANGE, [10, 360, 360])
-    A_WEAK_RIGHT = trimf(ANGLE_RANGE, [0, 15, 30])
-    A_STRAIGHT = trimf(ANGLE_RANGE, [-5, 0, 5])
-    A_WEAK_LEFT = trimf(ANGLE_RANGE, [-30, -15, 0])
-    A_STRG_LEFT = trimf(ANGLE_RANGE, [-360, -360, -10])
-
-    # level of steering (lower level means steering to the left)
-    STEER_LVL01 = trimf(INTENSITY, [-1.0, -1.0, -0.5])
-    STEER_LVL02 = trimf(INTENSITY, [-0.8, -0.3, 0.0])
-    STEER_LVL04 = trimf(INTENSITY, [-0.1, 0.0, 0.1])
-    STEER_LVL03 = trimf(INTENSITY, [-0.2, 0.0, 0.2])
-    STEER_LVL05 = trimf(INTENSITY, [0.0, 0.3, 0.8])
-    STEER_LVL06 = trimf(INTENSITY, [0.5, 1.0, 1.0])
-
-    drive_truck()
-
-    if len(argv) > 1 and argv[1] == "--plot":
+    ARGS = ArgumentParser(description="Fuzzy driver for a virtual truck.")
+    ARGS.add_argument(
+        "--plot", action="store_true", help="show the fuzzy sets afterwards"
+    )
+    ARGS.add_argument(
+        "--table",
+        help="drive with a table compiled by steering_table.py, instead of "
+        "evaluating the rules at every step",
+    )
+    ARGS.add_argument(
+        "--rules",
+        help="file with rules, and definitions of sets, to drive with "
+        "instead of RULES, written as in rule_base.py",
+    )
+    ARGS.add_argument("--host", default="127.0.0.1")
+    ARGS.add_argument("--port", type=int, default=4321)
+    ARGS.add_argument(
+        "--episodes",
+        type=int,
+        default=1,
+        help="episodes driven one after the other, waiting for the server "
+        "to be restarted between them",
+    )
+    ARGS.add_argument(
+        "--no-pipeline",
+        action="store_true",
+        help="wait for each steering value to be sent before asking for the "
+        "next state",
+    )
+    OPTIONS = ARGS.parse_args()
+
+    CONTROLLER = fuzzy_steer
+    if OPTIONS.table is not None:
+        from steering_table import SteeringTable  # pylint: disable=C0415
+
+        CONTROLLER = SteeringTable.load(OPTIONS.table)
+    elif OPTIONS.rules is not None:
+        with open(OPTIONS.rules) as RULES_FILE:
+            CONTROLLER = partial(
+                fuzzy_steer,
+                rule_base=RuleBase.parse(
+                    RULES_FILE.read(), VARIABLES, "steer", STEER_CORNERS
+                ),
+            )
+    CLIENT = TruckClient(
+        OPTIONS.host, OPTIONS.port, pipeline=not OPTIONS.no_pipeline
+    )
+    print(drive_truck(CONTROLLER, CLIENT, OPTIONS.episodes).report())
+
+    if OPTIONS.plot:
         plot_fuzzy_sets()
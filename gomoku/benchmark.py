@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""benchmark.py
+
+A fixed suite of positions, each searched to the same depth by a fresh
+engine, so that versions of the search can be compared: the nodes, time and
+nodes per second tell how fast it is, and the moves and scores tell if it
+still plays the same. Results are saved as JSON (or CSV), and an earlier
+run may be given to compare against.
+
+    $ python benchmark.py --output before.json
+    $ python benchmark.py --compare before.json
+"""
+
+from __future__ import absolute_import
+import csv
+import json
+from argparse import ArgumentParser
+
+from engine import Engine, coordinates, notation
+
+# name and moves of each position, starting with black; the player to move
+# is the one after the last move
+POSITIONS = (
+    ("first reply", "H8"),
+    ("block open three", "H8 A1 I8 A2 J8"),
+    ("block four", "H8 A1 I8 A2 J8 A3 K8"),
+    ("win with four", "H8 H9 A1 I9 B1 J9 C1 K9 O15"),
+    ("opening 8", "H8 I7 G9 J6 J7 H6 K8 G10"),
+    ("opening 12", "H8 G7 G6 G5 G8 F6 F7 E7 I9 D6 J8 G4"),
+    ("middle 14", "H8 I8 I7 G9 J6 K5 F10 H7 G6 J9 K10 L11 H6 I6"),
+    ("middle 14 b", "H8 H9 I9 G7 J10 K11 F6 I8 J7 G10 F11 E12 J8 J9"),
+    (
+        "middle 18",
+        "H8 H9 G9 I7 F10 E11 D12 G8 F7 I10 J11 E6 F8 F9 E7 H10 D6 C5",
+    ),
+    (
+        "middle 18 b",
+        "H8 I8 I7 G9 J6 K5 F10 H7 G6 J9 K10 L11 H6 I6 G5 J8 F4 E3",
+    ),
+)
+
+# columns of the CSV file, with a row for each position
+FIELDS = ("name", "move", "score", "depth", "nodes", "seconds", "nps")
+
+
+def run_position(
+    moves,
+    depth,
+    backend="python",
+    threats=(0, 0),
+    profile=False,
+    search="alphabeta",
+):
+    """
+    Searches a position of the suite with a new engine.
+
+    Args:
+        moves:      the moves of the position, as in `POSITIONS`.
+        depth:      depth of the search.
+        backend:    evaluation of the board, "python" or "numpy".
+        threats:    as in `Engine`; no threat-space search by default, so
+                    that the alpha-beta search is what is measured.
+        profile:    whether the search times the calls to the board.
+        search:     "alphabeta" or "pvs", as in `Engine`.
+
+    Returns:
+        A tuple with the Decision and the SearchStats of the search.
+    """
+    engine = Engine(
+        backend=backend,
+        think_ms=None,
+        max_depth=depth,
+        threats=threats,
+        profile=profile,
+        search=search,
+    )
+    player = 1
+    for move in moves.split():
+        engine.play(player, coordinates(move))
+        player = -player
+    return engine.think(player), engine.stats
+
+
+def run_suite(
+    depth, backend="python", threats=(0, 0), profile=False, search="alphabeta"
+):
+    """
+    Searches every position of the suite.
+
+    Args:
+        depth:      depth of each search.
+        backend:    evaluation of the board, "python" or "numpy".
+        threats:    as in `run_position`.
+        profile:    whether the report of each search is printed.
+        search:     "alphabeta" or "pvs", as in `Engine`.
+
+    Returns:
+        List with a dictionary of results for each position.
+    """
+    results = []
+    for name, moves in POSITIONS:
+        decision, stats = run_position(
+            moves, depth, backend, threats, profile, search
+        )
+        if profile:
+            print(name + "\n    " + stats.report().replace("\n", "\n    "))
+        results.append(
+            dict(
+                name=name,
+                move=notation(decision.move),
+                score=decision.score,
+                depth=decision.depth,
+                nodes=decision.nodes,
+                seconds=round(decision.seconds, 6),
+                nps=round(decision.nps, 1),
+            )
+        )
+    return results
+
+
+def compare(results, baseline):
+    """
+    Lines up the results of two runs of the suite.
+
+    Args:
+        results:    list of dictionaries, as returned by `run_suite`.
+        baseline:   the same, for an earlier run.
+
+    Returns:
+        List of strings, one for each position in both runs, with the ratio
+        of nodes and time between the runs, and whether the move or the
+        score changed.
+    """
+    before = {i["name"]: i for i in baseline}
+    lines = []
+    for result in results:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        changed = [i for i in ("move", "score") if result[i] != old[i]]
+        lines.append(
+            "{:<20} nodes x{:.2f}  time x{:.2f}  {}".format(
+                result["name"],
+                result["nodes"] / max(1, old["nodes"]),
+                result["seconds"] / max(1e-6, old["seconds"]),
+                "CHANGED " + ", ".join(changed) if changed else "same",
+            )
+        )
+    return lines
+
+
+def main():
+    """Runs the suite, saving and comparing its results."""
+    parser = ArgumentParser(description="Benchmarks the Gomoku search.")
+    parser.add_argument(
+        "--depth", type=int, default=3, help="depth of each search"
+    )
+    parser.add_argument(
+        "--backend", choices=("python", "numpy"), default="python"
+    )
+    parser.add_argument(
+        "--search", choices=("alphabeta", "pvs"), default="alphabeta"
+    )
+    parser.add_argument(
+        "--threats",
+        action="store_true",
+        help="look for forced victories before searching",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print where the time of each search goes",
+    )
+    parser.add_argument(
+        "--output", help="file for the results, CSV if it ends in .csv"
+    )
+    parser.add_argument("--compare", help="results of an earlier run, JSON")
+    args = parser.parse_args()
+
+    results = run_suite(
+        args.depth,
+        args.backend,
+        (10, 3) if args.threats else (0, 0),
+        args.profile,
+        args.search,
+    )
+    for result in results:
+        print(
+            "{name:<20} {move:>4} {score:>16.2f} {nodes:>9} nodes "
+            "{seconds:>9.3f} s {nps:>10.0f} nodes/s".format(**result)
+        )
+    nodes = sum(i["nodes"] for i in results)
+    seconds = sum(i["seconds"] for i in results)
+    print(
+        "{} nodes in {:.3f} s, {:.0f} nodes/s".format(
+            nodes, seconds, nodes / seconds if seconds else 0
+        )
+    )
+
+    if args.output is not None:
+        with open(args.output, "w", newline="") as output:
+            if args.output.endswith(".csv"):
+                writer = csv.DictWriter(output, FIELDS)
+                writer.writeheader()
+                writer.writerows(results)
+            else:
+                json.dump(results, output, indent=1)
+
+    if args.compare is not None:
+        with open(args.compare) as baseline:
+            print("\n".join(compare(results, json.load(baseline))))
+
+
+if __name__ == "__main__":
+    main()
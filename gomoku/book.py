@@ -0,0 +1,335 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""book.py
+
+An opening book remembers the results of deep searches of the first moves
+of a game, which are the same in every game, so that they are answered at
+once instead of being searched again. Positions that the search proved to
+be won or lost are kept as well, at any point of the game.
+
+A position and its seven rotations and reflections share a single entry,
+keyed by `GomokuBoard.canonical_key`; the move of an entry is kept for the
+symmetric board that was hashed, and turned back for the board at hand.
+
+Books are saved as a short header followed by fixed-size records sorted by
+key, and the file is memory-mapped and binary searched when it is read, so
+that opening even a large book costs nothing. Entries learned while playing
+are kept in memory until the book is saved. Running this module fills a
+book offline, by searching every position up to a few moves deep.
+"""
+
+from __future__ import absolute_import
+import mmap
+import os
+from argparse import ArgumentParser
+from collections import namedtuple
+from struct import Struct
+
+from minimax import ab_pruning, proven
+
+# magic number, format version, side of the board and number of records
+HEADER = Struct("<4sHHI")
+MAGIC, VERSION = b"GMKB", 1
+
+# key, score, index of the move (NO_MOVE if there is none) and depth
+RECORD = Struct("<QdHB")
+NO_MOVE = 2 ** 16 - 1
+
+Entry = namedtuple("Entry", "key depth score move")
+
+
+class OpeningBook:
+    """Search results for positions, shared by all their symmetries."""
+
+    def __init__(
+        self, side=15, path=None, max_stones=8, min_depth=3, learn=False
+    ):
+        """
+        Inits OpeningBook, reading the book saved at the path, if any.
+
+        Args:
+            side:       size of the square's side for the boards.
+            path:       file the book is read from and saved to, or None
+                        for a book kept in memory alone.
+            max_stones: positions with more stones than this are only kept
+                        if they were proven to be won or lost.
+            min_depth:  searches shallower than this are not kept.
+            learn:      whether `record` keeps the results of the search.
+
+        Raises:
+            ValueError: if the file is not a book for boards of this side.
+        """
+        self.side = side
+        self.path = path
+        self.max_stones = max_stones
+        self.min_depth = min_depth
+        self.learn = learn
+
+        self.added = {}
+        self.handle, self.mapped, self.count = None, None, 0
+        if path is not None and os.path.exists(path):
+            self.open(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        """Counts the positions in the book, saved or not."""
+        return self.count + sum(
+            1 for i in self.added if self.lookup(i) is None
+        )
+
+    def open(self, path):
+        """
+        Maps a saved book into memory.
+
+        Args:
+            path:   file the book was saved to.
+
+        Raises:
+            ValueError: if the file is not a book for boards of this side.
+        """
+        self.close()
+        self.handle = open(path, "rb")
+        if os.fstat(self.handle.fileno()).st_size < HEADER.size:
+            self.close()
+            raise ValueError("{} is not an opening book".format(path))
+
+        self.mapped = mmap.mmap(
+            self.handle.fileno(), 0, access=mmap.ACCESS_READ
+        )
+        magic, version, side, count = HEADER.unpack_from(self.mapped)
+        if (magic, version) != (MAGIC, VERSION):
+            self.close()
+            raise ValueError("{} is not an opening book".format(path))
+        if side != self.side:
+            self.close()
+            raise ValueError(
+                "{0} is a book for a {1} * {1} board".format(path, side)
+            )
+        self.count = count
+
+    def close(self):
+        """Unmaps the saved book, keeping what was learned since."""
+        if self.mapped is not None:
+            self.mapped.close()
+        if self.handle is not None:
+            self.handle.close()
+        self.handle, self.mapped, self.count = None, None, 0
+
+    def lookup(self, key):
+        """
+        Binary searches the saved book for a key.
+
+        Args:
+            key:    a canonical hash, as given by `canonical_key`.
+
+        Returns:
+            The Entry saved for the key, with the move as an index into the
+            flat array of the symmetric board, or None.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record = RECORD.unpack_from(
+                self.mapped, HEADER.size + middle * RECORD.size
+            )
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                key, score, move, depth = record
+                return Entry(key, depth, score, move)
+        return None
+
+    def wanted(self, board, score):
+        """
+        Checks if a position belongs in the book: either it is early in the
+        game, or the search found a forced victory.
+
+        Args:
+            board:  a GomokuBoard object.
+            score:  the score found for the position.
+
+        Returns:
+            True if the position may be kept, False otherwise.
+        """
+        if proven(score):
+            return True
+        return len(board.cells) - board.cells.count(0) <= self.max_stones
+
+    def probe(self, board, player):
+        """
+        Looks up a position, or any of its symmetries.
+
+        Args:
+            board:  a GomokuBoard object.
+            player: a integer representing the player to move.
+
+        Returns:
+            The Entry for the position, with the move as the board matrix's
+            coordinates for this very board, or None.
+        """
+        if not self.count and not self.added:
+            return None
+
+        key, number = board.canonical_key(player)
+        entry = self.added.get(key) or self.lookup(key)
+        if entry is None:
+            return None
+
+        move = None
+        if entry.move != NO_MOVE:
+            symmetry = board.geometry.symmetries[number]
+            move = divmod(symmetry.index(entry.move), self.side)
+            if not board.is_empty_space(move):
+                return None
+
+        return entry._replace(move=move)
+
+    def record(self, board, player, depth, score, move):
+        """
+        Keeps the exact result of a search, if the book is learning and the
+        position belongs in it, unless a deeper one is already known.
+
+        Args:
+            board:  a GomokuBoard object.
+            player: a integer representing the player to move.
+            depth:  how many plies were searched below the position.
+            score:  the score returned by the search.
+            move:   the board matrix's coordinates for the best move, or
+                    None if there is none.
+        """
+        if not self.learn or depth < self.min_depth:
+            return
+        if not self.wanted(board, score):
+            return
+
+        key, number = board.canonical_key(player)
+        known = self.added.get(key) or self.lookup(key)
+        if known is not None and known.depth >= depth:
+            return
+
+        index = NO_MOVE
+        if move is not None:
+            symmetry = board.geometry.symmetries[number]
+            index = symmetry[move[0] * self.side + move[1]]
+        self.added[key] = Entry(key, min(depth, 255), score, index)
+
+    def save(self, path=None):
+        """
+        Writes the saved entries, merged with the learned ones, to a new file
+        that then replaces the book.
+
+        Args:
+            path:   file to save to, or None for the path of the book.
+        """
+        path = self.path if path is None else path
+        entries = {
+            i.key: i
+            for i in (
+                Entry(key, depth, score, move)
+                for key, score, move, depth in (
+                    RECORD.unpack_from(
+                        self.mapped, HEADER.size + i * RECORD.size
+                    )
+                    for i in range(self.count)
+                )
+            )
+        }
+        entries.update(self.added)
+
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as book:
+            book.write(HEADER.pack(MAGIC, VERSION, self.side, len(entries)))
+            for key in sorted(entries):
+                entry = entries[key]
+                book.write(
+                    RECORD.pack(key, entry.score, entry.move, entry.depth)
+                )
+
+        self.close()
+        os.replace(temporary, path)
+        self.path = path
+        self.added.clear()
+        self.open(path)
+
+
+def fill_book(book, board, player, plies, depth):
+    """
+    Searches every position reachable from a board in a few moves, and keeps
+    the results in a book. Symmetric positions are only searched once.
+
+    Args:
+        book:   a learning OpeningBook.
+        board:  a GomokuBoard object.
+        player: a integer representing the player to move.
+        plies:  how many moves deep positions are searched.
+        depth:  depth of the search of each position.
+    """
+    # pylint: disable=C0415
+    from ordering import MoveOrdering
+    from transposition import TranspositionTable
+
+    seen = set()
+    table, ordering = TranspositionTable(), MoveOrdering()
+    inf = float("inf")
+
+    def visit(player, plies):
+        key = board.canonical_key(player)[0]
+        if key in seen or board.victory():
+            return
+        seen.add(key)
+
+        table.new_search()
+        ab_pruning(
+            board, depth, -inf, inf, player, table, None, ordering, book
+        )
+        if plies == 0:
+            return
+
+        for move in board.candidate_moves():
+            board.make_move(player, move)
+            visit(-player, plies - 1)
+            board.undo_move()
+
+    visit(player, plies)
+
+
+def main():
+    """Fills a book offline, starting from the center of an empty board."""
+    from gomoku_board import GomokuBoard  # pylint: disable=C0415
+
+    parser = ArgumentParser(description="Fills an opening book for Gomoku.")
+    parser.add_argument("path", help="file the book is read from and saved to")
+    parser.add_argument(
+        "--plies",
+        type=int,
+        default=2,
+        help="how many moves after the first one are searched",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=3, help="depth of each search"
+    )
+    parser.add_argument(
+        "--side", type=int, default=15, help="size of the board's side"
+    )
+    args = parser.parse_args()
+
+    board = GomokuBoard(args.side)
+    board.make_move(1, (args.side // 2, args.side // 2))
+    with OpeningBook(
+        args.side, args.path, args.plies + 1, args.depth, learn=True
+    ) as book:
+        fill_book(book, board, -1, args.plies, args.depth)
+        book.save()
+        print("{} positions in {}".format(len(book), args.path))
+
+
+if __name__ == "__main__":
+    main()
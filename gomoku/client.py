@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""client.py
+
+Plays games against a running `server.py`, many at once, to try it out: each
+client opens its own connection and answers the server with random moves
+around the stones, drawn from a seed, while timing how long the server takes
+to reply to each of them. The first client may let the server think much
+longer than the others, to see that its searches do not hold them up.
+
+    $ python client.py --port 5005 --clients 8 --think-ms 200
+    $ python client.py --port 5005 --clients 4 --long-ms 5000
+"""
+
+from __future__ import absolute_import
+import asyncio
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from gomoku_board import GomokuBoard
+
+
+async def play_client(host, port, number, side=15, think_ms=200, seed=0):
+    """
+    Plays a whole game against the server, starting with the server's move
+    on even numbers and with a random one on odd numbers.
+
+    Args:
+        host:       address of the server.
+        port:       port of the server.
+        number:     number of the client, which also picks its moves.
+        side:       size of the board's side.
+        think_ms:   time the server may take for each move, in milliseconds.
+        seed:       seed of the random moves, along with the number.
+
+    Returns:
+        A dictionary with the winner (1 for the server, -1 for the client, 0
+        for a draw), the number of moves, the latencies of the replies and
+        the time the whole game took, in seconds.
+    """
+    rng = Random(seed * 2 ** 20 + number)
+    board = GomokuBoard(side)
+    reader, writer = await asyncio.open_connection(host, port)
+    latencies, begin = [], perf_counter()
+
+    async def send(line):
+        start = perf_counter()
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+        answer = (await reader.readline()).decode().strip()
+        latencies.append(perf_counter() - start)
+        if answer.startswith(("ERROR", "UNKNOWN")):
+            raise RuntimeError("client {}: {}".format(number, answer))
+        return answer
+
+    def place(player, answer):
+        x, y = (int(i) for i in answer.split(","))
+        board.place_stone(player, (y, x))
+
+    try:
+        writer.write("INFO timeout_turn {}\r\n".format(think_ms).encode())
+        await send("START {}".format(side))
+        latencies.clear()
+
+        server = 1 if number % 2 == 0 else -1
+        if server == 1:
+            place(server, await send("BEGIN"))
+        else:
+            board.place_stone(-server, (side // 2, side // 2))
+            place(server, await send("TURN {0},{0}".format(side // 2)))
+
+        while not board.victory() and not board.draw():
+            row, column = rng.choice(board.candidate_moves())
+            board.place_stone(-server, (row, column))
+            if board.victory() or board.draw():
+                break
+            place(server, await send("TURN {},{}".format(column, row)))
+
+        writer.write(b"END\r\n")
+        await writer.drain()
+    finally:
+        writer.close()
+
+    return dict(
+        winner=board.winner * server,
+        moves=len(board.history),
+        latencies=latencies,
+        seconds=perf_counter() - begin,
+    )
+
+
+async def play_clients(
+    host, port, clients, side, think_ms, seed, long_ms=None
+):
+    """
+    Plays games against the server at the same time.
+
+    Args:
+        host:       address of the server.
+        port:       port of the server.
+        clients:    number of games played at once.
+        side:       size of the board's side.
+        think_ms:   time the server may take for each move, in milliseconds.
+        seed:       seed of the random moves.
+        long_ms:    time the server may take for each move of the first
+                    client, in milliseconds, or None for `think_ms`.
+
+    Returns:
+        List with the result of each game, as in `play_client`.
+    """
+    return await asyncio.gather(
+        *(
+            play_client(
+                host,
+                port,
+                i,
+                side,
+                long_ms if i == 0 and long_ms is not None else think_ms,
+                seed,
+            )
+            for i in range(clients)
+        )
+    )
+
+
+def main():
+    """Plays the games and sums up how fast the server replied."""
+    parser = ArgumentParser(description="Random games against server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument(
+        "--clients", type=int, default=4, help="games played at once"
+    )
+    parser.add_argument(
+        "--side", type=int, default=15, help="size of the board's side"
+    )
+    parser.add_argument(
+        "--think-ms",
+        type=int,
+        default=200,
+        help="time the server may take for each move, in milliseconds",
+    )
+    parser.add_argument(
+        "--long-ms",
+        type=int,
+        help="time the server may take for each move of the first client, "
+        "in milliseconds",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the random moves"
+    )
+    args = parser.parse_args()
+
+    start = perf_counter()
+    results = asyncio.run(
+        play_clients(
+            args.host,
+            args.port,
+            args.clients,
+            args.side,
+            args.think_ms,
+            args.seed,
+            args.long_ms,
+        )
+    )
+    elapsed = perf_counter() - start
+
+    latencies = sorted(i for j in results for i in j["latencies"])
+    for number, result in enumerate(results):
+        print(
+            "client {}: {} in {} moves, {:.3f} s/reply, {:.1f} s".format(
+                number,
+                {1: "server won", -1: "client won", 0: "draw"}[
+                    result["winner"]
+                ],
+                result["moves"],
+                sum(result["latencies"]) / max(1, len(result["latencies"])),
+                result["seconds"],
+            )
+        )
+    if latencies:
+        print(
+            "{} replies in {:.3f} s; median {:.3f} s, max {:.3f} s".format(
+                len(latencies),
+                elapsed,
+                latencies[len(latencies) // 2],
+                latencies[-1],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# pylint: disable=R0913
+
+"""engine.py
+
+The computer player without the terminal around it: an Engine keeps a board
+along with everything its searches carry from one move to the next, takes
+the moves of both players and answers with its own, measuring each search.
+It is what scripts, such as the self-play runner and the benchmarks, play
+through.
+"""
+
+from __future__ import absolute_import
+from collections import namedtuple
+from time import time
+
+from gomoku_board import GomokuBoard
+from minimax import ab_pruning, iterative_deepening
+from negamax import PVSearch
+from ordering import MoveOrdering
+from stats import SearchStats
+from transposition import TranspositionTable
+
+
+class Decision(namedtuple("Decision", "move score depth nodes seconds")):
+    """A move chosen by the engine, and what it took to find it."""
+
+    __slots__ = ()
+
+    @property
+    def nps(self):
+        """Nodes visited per second."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def branching(self):
+        """
+        Effective branching factor: how many children of each node would
+        have to be visited, on average, to visit as many nodes in a tree
+        that deep.
+        """
+        return self.nodes ** (1 / self.depth) if self.depth else 0.0
+
+
+def board_kind(backend):
+    """
+    Picks the class of board for an evaluation backend. NumPy is only
+    imported if it is asked for.
+
+    Args:
+        backend:    either "python" or "numpy".
+
+    Returns:
+        GomokuBoard or one of its subclasses.
+    """
+    if backend == "numpy":
+        from numpy_board import NumpyBoard  # pylint: disable=C0415
+
+        return NumpyBoard
+    return GomokuBoard
+
+
+def notation(position):
+    """
+    Writes a position as it is typed in the game, with the letter of the
+    column followed by the number of the row.
+
+    Args:
+        position:   the board matrix's coordinates.
+
+    Returns:
+        A string such as "H8".
+    """
+    row, column = position
+    return "{}{}".format(chr(65 + column), row + 1)
+
+
+def coordinates(text):
+    """
+    Reads a position written as in `notation`.
+
+    Args:
+        text:   a string such as "H8".
+
+    Returns:
+        The board matrix's coordinates.
+    """
+    return int(text[1:]) - 1, ord(text[0].upper()) - 65
+
+
+class Engine:
+    """A board and a computer player that searches it."""
+
+    def __init__(
+        self,
+        side=15,
+        backend="python",
+        radius=1,
+        think_ms=500,
+        max_depth=None,
+        table_mb=64,
+        book=None,
+        threats=(10, 3),
+        seed=None,
+        profile=False,
+        search="alphabeta",
+    ):
+        """
+        Inits Engine with an empty board.
+
+        Args:
+            side:       size of the square's side for the board.
+            backend:    evaluation of the board, "python" or "numpy".
+            radius:     distance from the stones within which moves are
+                        searched.
+            think_ms:   time each move may take, in milliseconds, or None
+                        to only stop at `max_depth`.
+            max_depth:  deepest search to try, or None to only stop on time.
+            table_mb:   memory for the transposition table, in megabytes.
+            book:       an OpeningBook consulted before searching, or None.
+            threats:    how many fours, and how many fours and threes, in a
+                        row a forced victory is looked for with before
+                        searching.
+            seed:       breaks ties between moves with a random permutation
+                        drawn from this seed, or by coordinates if None.
+            profile:    whether the searches time the calls to the board and
+                        the move ordering, as in SearchStats.
+            search:     "alphabeta", or "pvs" for principal variation search
+                        with aspiration windows.
+        """
+        assert think_ms is not None or max_depth is not None
+        self.board = board_kind(backend)(side, radius=radius)
+        self.table = TranspositionTable(table_mb * 2 ** 20)
+        self.ordering = MoveOrdering(seed)
+        self.stats = SearchStats(profile)
+        self.think_ms = think_ms
+        self.max_depth = max_depth
+        self.book = book
+        self.threats = threats
+        self.search = PVSearch() if search == "pvs" else ab_pruning
+
+    def reset(self):
+        """Starts a new game, forgetting the searches of the last one."""
+        self.board.clear()
+        self.table.clear()
+        self.ordering.clear()
+
+    def over(self):
+        """
+        Checks if the game has ended.
+
+        Returns:
+            True if a player has won or the board is full, False otherwise.
+        """
+        return self.board.victory() or self.board.draw()
+
+    def play(self, player, position):
+        """
+        Places a stone of either player.
+
+        Args:
+            player:     a integer representing the player.
+            position:   the board matrix's coordinates for the play.
+
+        Raises:
+            ValueError: if the game is over or the intersection is not an
+                        empty one.
+        """
+        side = self.board.side
+        if self.over():
+            raise ValueError("The game is over")
+        if not all(0 <= i < side for i in position) or (
+            not self.board.is_empty_space(position)
+        ):
+            raise ValueError("{} is not free".format(notation(position)))
+        self.board.place_stone(player, position)
+
+    def think(self, player):
+        """
+        Searches for the best move of a player, without playing it.
+
+        Args:
+            player: a integer representing the player to move.
+
+        Returns:
+            A Decision.
+        """
+        self.stats.reset()
+        start = time()
+        empty = self.board.cells.count(0)
+        if empty == 1:
+            return Decision(self.board.candidate_moves()[0], 0, 0, 0, 0.0)
+
+        # the search cannot score a full board, so it stops a move short
+        max_depth = empty - 1
+        if self.max_depth is not None:
+            max_depth = min(self.max_depth, max_depth)
+
+        think_ms = float("inf") if self.think_ms is None else self.think_ms
+        score, move, depth = iterative_deepening(
+            self.board,
+            player,
+            think_ms,
+            self.table,
+            max_depth,
+            self.ordering,
+            book=self.book,
+            vcf_depth=self.threats[0],
+            vct_depth=self.threats[1],
+            stats=self.stats,
+            search=self.search,
+        )
+        return Decision(move, score, depth, self.stats.nodes, time() - start)
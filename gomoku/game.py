@@ -8,11 +8,18 @@ Control logic for the Gomoku game and main class for the program.
 """
 
 from __future__ import absolute_import
+import os
+from argparse import ArgumentParser
 from itertools import cycle
 from re import match
 
-from gomoku_board import GomokuBoard
-from minimax import ab_pruning
+from book import OpeningBook
+from engine import board_kind
+from minimax import ab_pruning, iterative_deepening, principal_variation
+from negamax import PVSearch
+from parallel import ParallelSearch
+from ponder import Ponder
+from transposition import TranspositionTable
 
 
 def clear_line():
@@ -28,6 +35,11 @@ def clear_line():
     print(cursor_up + erase_line + cursor_up)
 
 
+def clear_screen():
+    """Wipes the terminal, so that the board is always drawn at the top."""
+    os.system("cls" if os.name == "nt" else "clear")
+
+
 def player_input(board, player):
     """
     Input loop for the game. Matches valid coordinates on the board.
@@ -66,7 +78,17 @@ def player_input(board, player):
     return pos
 
 
-def game_loop(board, mode=None):
+def game_loop(
+    board,
+    mode=None,
+    table=None,
+    think_ms=500,
+    pool=None,
+    book=None,
+    threats=(10, 3),
+    search=ab_pruning,
+    ponder=False,
+):
     """
     Controls the game logic by managing the board, and calling user inputs, or
     the minimax function if a computer is playing.
@@ -74,17 +96,58 @@ def game_loop(board, mode=None):
     Args:
         board:  a GomokuBoard object.
         mode:   a string that decides how the game should act.
+        table:  a TranspositionTable kept by the computer for the whole game.
+        think_ms:   time the computer may spend on each move, in
+                    milliseconds.
+        pool:       a ParallelSearch used by the computer, or None to search
+                    in a single process.
+        book:       an OpeningBook used by the computer, saved at the end of
+                    the game if it is learning, or None.
+        threats:    how many fours, and how many fours and threes, in a row
+                    the computer looks for a forced victory with before
+                    searching.
+        search:     the search run by the computer at each depth, either
+                    `ab_pruning` or a `negamax.PVSearch`.
+        ponder:     whether the computer searches while the human thinks, as
+                    in `ponder.Ponder`.
     """
     if mode == "exit":
         raise SystemExit
 
     turn = cycle([1, -1])
+    table = TranspositionTable() if table is None else table
+    guess, found, pondered = None, None, 0
 
     while not board.victory():
         player = next(turn)
+        clear_screen()
         print(board)
         if mode == "shodan" and player == -1:
-            _, pos = ab_pruning(board, 2, float("-inf"), float("inf"), player)
+            if found is not None and pondered >= think_ms:
+                pos = found[1]
+            else:
+                # the time spent pondering the move played counts for it
+                _, pos, _ = iterative_deepening(
+                    board,
+                    player,
+                    think_ms - pondered,
+                    table,
+                    pool=pool,
+                    book=book,
+                    vcf_depth=threats[0],
+                    vct_depth=threats[1],
+                    search=search,
+                )
+            line = principal_variation(board, player, table, 2)
+            guess = line[1] if len(line) > 1 and line[0] == pos else None
+            found, pondered = None, 0
+        elif mode == "shodan" and ponder and board.history:
+            pondering = Ponder(board, -player, table, guess, search=search)
+            pondering.begin()
+            pos = player_input(board, player)
+            found = pondering.finish(pos)
+            if found is not None:
+                pondered = pondering.seconds * 1000
         else:
             pos = player_input(board, player)
         board.place_stone(player, pos)
@@ -92,28 +155,131 @@ def game_loop(board, mode=None):
     message = (
         "\nDraw!"
         if board.draw()
-        else "\nWinner: {}".format(board.stones[player])
+        else "\nWinner: {}".format(board.stones[board.winner])
     )
 
+    clear_screen()
     print(board, message)
     board.clear()
 
+    if book is not None and book.learn and book.path is not None:
+        book.save()
+
+
+def parse_args():
+    """
+    Reads the command line options.
+
+    Returns:
+        An argparse.Namespace with the options.
+    """
+    parser = ArgumentParser(description="Gomoku against humans or the AI.")
+    parser.add_argument(
+        "--table-mb",
+        type=int,
+        default=64,
+        help="memory for the AI's transposition table, in megabytes",
+    )
+    parser.add_argument(
+        "--think-ms",
+        type=int,
+        default=500,
+        help="time the AI may spend on each move, in milliseconds",
+    )
+    parser.add_argument(
+        "--radius",
+        type=int,
+        default=1,
+        help="distance from the stones within which the AI looks for moves",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("python", "numpy"),
+        default="python",
+        help="evaluation of the board: lines kept up to date in Python, "
+        "or all of them scored at once with NumPy",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes searching for the AI's moves at the same time",
+    )
+    parser.add_argument(
+        "--book", help="opening book file the AI answers known positions from"
+    )
+    parser.add_argument(
+        "--learn",
+        action="store_true",
+        help="add the AI's deep searches to the opening book after each game",
+    )
+    parser.add_argument(
+        "--vcf-depth",
+        type=int,
+        default=10,
+        help="fours in a row the AI looks for a forced victory with",
+    )
+    parser.add_argument(
+        "--vct-depth",
+        type=int,
+        default=3,
+        help="fours and open threes in a row the AI looks for a forced "
+        "victory with",
+    )
+    parser.add_argument(
+        "--search",
+        choices=("alphabeta", "pvs"),
+        default="alphabeta",
+        help="search of the AI: alpha-beta, or principal variation search "
+        "with aspiration windows",
+    )
+    parser.add_argument(
+        "--ponder",
+        action="store_true",
+        help="let the AI search while the human is thinking",
+    )
+    return parser.parse_args()
+
 
 def main():
     """Menu for the game."""
+    args = parse_args()
     choices = {
         "0": dict(desc="quit", mode="exit"),
         "1": dict(desc="human x human", mode="two_player"),
         "2": dict(desc="human x computer", mode="shodan"),
     }
 
+    pool = ParallelSearch(args.workers) if args.workers > 1 else None
+    kind = board_kind(args.backend)
+    book = None
+    if args.book is not None:
+        book = OpeningBook(15, args.book, learn=args.learn)
+
     for key in sorted(choices.keys()):
         print("[{}] {}".format(key, choices[key]["desc"]))
-    while True:
-        option = input("Choice: ")
-        if option in choices.keys():
-            game_loop(GomokuBoard(15), choices[option]["mode"])
-        clear_line()
+    try:
+        while True:
+            option = input("Choice: ")
+            if option in choices.keys():
+                table = TranspositionTable(args.table_mb * 2 ** 20)
+                game_loop(
+                    kind(15, radius=args.radius),
+                    choices[option]["mode"],
+                    table,
+                    args.think_ms,
+                    pool,
+                    book,
+                    (args.vcf_depth, args.vct_depth),
+                    PVSearch() if args.search == "pvs" else ab_pruning,
+                    args.ponder,
+                )
+            clear_line()
+    finally:
+        if pool is not None:
+            pool.close()
+        if book is not None:
+            book.close()
 
 
 if __name__ == "__main__":
@@ -11,49 +11,145 @@ more stones horizontally, vertically or diagonally.
 """
 
 from __future__ import absolute_import, division
-import os
+from array import array
+from functools import lru_cache
 from itertools import chain, groupby, product, starmap
-from random import randint
+from math import isclose
+from random import Random, randint, shuffle
 
+# steps along a row, a column, a diagonal and an antidiagonal
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# score of a line in which a player is one move away from a victory
+WIN = 2 ** 32
+
+# score of a position won on the board, or by a forced sequence: far above
+# any sum of line scores, so that it is not mistaken for a line worth WIN,
+# which may still be blocked
+VICTORY = 2 ** 40
+
+# line scores are summed as integers in millionths, so that a position is
+# worth the same no matter the order in which its stones were placed
+SCALE = 10 ** 6
 
-class GomokuBoard:
-    """Board with n * n intersections where stones are placed."""
+
+class Geometry:
+    """
+    Everything about a board that depends on its side alone: the rows,
+    columns, diagonals and antidiagonals as lists of intersections, the
+    lines through each intersection, the neighbors of each intersection,
+    the symmetries of the square, the n-uple factors and the Zobrist keys.
+    It is computed once for each side, through `geometry`, and shared by
+    all boards of that side.
+    """
 
     def __init__(self, side):
         """
-        Inits GomokuBoard with the attributes introduced above.
+        Inits Geometry with the attributes introduced above.
 
         Args:
             side:   size of the square's side for the board.
         """
-        assert side >= 5, "No victory conditions!"
-
         self.side = side
-        self.board = [[0 for _ in range(side)] for _ in range(side)]
-        self.stones = {0: " ", 1: "●", -1: "○"}
+        self.lines, self.directions, self.cell_lines = self.board_lines()
+        self.coordinates = [
+            [divmod(i, side) for i in line] for line in self.lines
+        ]
+
+        # position of each intersection inside each line through it
+        self.cell_slots = [[0] * len(DIRECTIONS) for _ in range(side ** 2)]
+        for line, direction in zip(self.lines, self.directions):
+            for slot, index in enumerate(line):
+                self.cell_slots[index][direction] = slot
+
         self.factors = self.nuple_factors()
+        self.keys, self.turn_key = self.zobrist_keys()
+        self.symmetries = self.board_symmetries()
+        self.neighbor_tables = {}
 
-    def __str__(self):
-        """Pretty-prints the board with black and white bullets."""
-        os.system("cls" if os.name == "nt" else "clear")
+    def board_lines(self):
+        """
+        Enumerates every row, column, diagonal and antidiagonal of the board
+        as lists of indices into the flat array of intersections.
 
-        letter_row = (
-            "     "
-            + " ".join(chr(i) for i in range(65, 65 + len(self.board[0])))
-            + "\n"
-        )
-        top_row = "   ┏" + "━" * (2 * len(self.board[0]) + 1) + "┓\n"
-        bottom_row = "   ┗" + "━" * (2 * len(self.board[0]) + 1) + "┛"
-        mid_rows = ""
+        Returns:
+            A tuple with the list of lines, the direction (an index into
+            DIRECTIONS) of each line, and the indices of the four lines that
+            pass through each intersection.
+        """
+        side = self.side
+        lines, directions = [], []
+        cell_lines = [[] for _ in range(side * side)]
 
-        for i, row in enumerate(self.board):
-            mid_rows += (
-                "{:02d} ┃ ".format(i + 1)
-                + " ".join(self.stones[i] for i in row)
-                + " ┃\n"
+        for direction, (d_x, d_y) in enumerate(DIRECTIONS):
+            for start_x, start_y in product(range(side), repeat=2):
+                # lines start where a step backwards would leave the board
+                if 0 <= start_x - d_x < side and 0 <= start_y - d_y < side:
+                    continue
+
+                line, i, j = [], start_x, start_y
+                while 0 <= i < side and 0 <= j < side:
+                    cell_lines[i * side + j].append(len(lines))
+                    line.append(i * side + j)
+                    i, j = i + d_x, j + d_y
+
+                lines.append(line)
+                directions.append(direction)
+
+        return lines, directions, cell_lines
+
+    def board_symmetries(self):
+        """
+        Enumerates the eight rotations and reflections of the square, which
+        turn a position into another one that is just as good.
+
+        Returns:
+            List of tuples, one for each symmetry, with the index that every
+            intersection is moved to; the first one is the identity.
+        """
+        last = self.side - 1
+        transforms = (
+            lambda x, y: (x, y),
+            lambda x, y: (y, last - x),
+            lambda x, y: (last - x, last - y),
+            lambda x, y: (last - y, x),
+            lambda x, y: (x, last - y),
+            lambda x, y: (last - x, y),
+            lambda x, y: (y, x),
+            lambda x, y: (last - y, last - x),
+        )
+        return [
+            tuple(
+                i * self.side + j
+                for i, j in starmap(
+                    transform, product(range(self.side), repeat=2)
+                )
             )
+            for transform in transforms
+        ]
 
-        return letter_row + top_row + mid_rows + bottom_row
+    def zobrist_keys(self):
+        """
+        Draws a random 64-bit number for each color on each intersection,
+        and one for the player to move. The hash of a board is the XOR of
+        the numbers of its stones, which can be updated with a single XOR
+        whenever a stone is placed or removed [1]. The generator is seeded
+        with the side of the board, so that hashes are the same across
+        instances and processes.
+
+        Returns:
+            A tuple with a dictionary mapping each player to a list of
+            numbers for every intersection, and the number for whose turn
+            it is.
+
+        [1] https://en.wikipedia.org/wiki/Zobrist_hashing
+        """
+        rng = Random(self.side)
+        keys = {
+            player: [rng.getrandbits(64) for _ in range(self.side ** 2)]
+            for player in (1, -1)
+        }
+        return keys, rng.getrandbits(64)
 
     def nuple_factors(self, default=0.1):
         """
@@ -82,20 +178,236 @@ class GomokuBoard:
 
         return {i + 1: j for i, j in enumerate(factors)}
 
-    def diagonals(self, invert=True):
+    def neighbors(self, radius):
+        """
+        Lists the neighbors of every intersection, as in `neighbor_board`,
+        computed once for each radius.
+
+        Args:
+            radius:     depth of the neighbor search around an intersection.
+
+        Returns:
+            List with the indices of the neighbors of each intersection, in
+            the flat array.
+        """
+        if radius not in self.neighbor_tables:
+            side = self.side
+            table = []
+            for index in range(side * side):
+                x_coord, y_coord = divmod(index, side)
+                neighbors = []
+                for i in range(1, radius + 1):
+                    neighbors += list(
+                        starmap(
+                            lambda a, b: (x_coord + a, y_coord + b),
+                            product((0, -i, +i), (0, -i, +i)),
+                        )
+                    )
+                table.append(
+                    [
+                        i * side + j
+                        for i, j in neighbors
+                        if (i, j) != (x_coord, y_coord)
+                        and 0 <= i < side
+                        and 0 <= j < side
+                    ]
+                )
+            self.neighbor_tables[radius] = table
+
+        return self.neighbor_tables[radius]
+
+
+@lru_cache(maxsize=None)
+def geometry(side):
+    """
+    Shares the geometry of a board among all boards of the same side.
+
+    Args:
+        side:   size of the square's side for the board.
+
+    Returns:
+        A Geometry object.
+    """
+    return Geometry(side)
+
+
+class GomokuBoard:
+    """
+    Board with n * n intersections where stones are placed.
+
+    The intersections are kept in a flat, row-major array of signed bytes,
+    so that a search may play and take back moves in place through
+    `make_move` and `undo_move` instead of copying the whole board for
+    every node. The usual list of lists is still available through the
+    `board` attribute as a view.
+    """
+
+    def __init__(self, side, check=False, radius=1):
+        """
+        Inits GomokuBoard with the attributes introduced above.
+
+        Args:
+            side:   size of the square's side for the board.
+            check:  compares every incremental evaluation against a full
+                    recomputation, for debugging purposes.
+            radius: how far from the stones, along each direction, an empty
+                    intersection is still a candidate move.
+        """
+        assert side >= 5, "No victory conditions!"
+
+        self.side = side
+        self.geometry = geo = geometry(side)
+        self.cells = array("b", bytes(side * side))
+        self.history = []
+        self.winner, self.win_ply = 0, 0
+        self.stones = {0: " ", 1: "●", -1: "○"}
+        self.factors = geo.factors
+        self.check = check
+
+        self.lines, self.directions = geo.lines, geo.directions
+        self.cell_lines, self.cell_slots = geo.cell_lines, geo.cell_slots
+        self.rescore()
+
+        self.keys, self.turn_key = geo.keys, geo.turn_key
+        self.hash = 0
+
+        self.radius = radius
+        self.neighbors = geo.neighbors(radius)
+        self.reset_frontier()
+
+    def __str__(self):
+        """Pretty-prints the board with black and white bullets."""
+        letter_row = (
+            "     "
+            + " ".join(chr(i) for i in range(65, 65 + self.side))
+            + "\n"
+        )
+        top_row = "   ┏" + "━" * (2 * self.side + 1) + "┓\n"
+        bottom_row = "   ┗" + "━" * (2 * self.side + 1) + "┛"
+        mid_rows = ""
+
+        for i, row in enumerate(self.board):
+            mid_rows += (
+                "{:02d} ┃ ".format(i + 1)
+                + " ".join(self.stones[i] for i in row)
+                + " ┃\n"
+            )
+
+        return letter_row + top_row + mid_rows + bottom_row
+
+    @property
+    def board(self):
+        """
+        Matrix representation for the board, built from the flat array of
+        intersections. Changing it does not change the board; assign a new
+        matrix instead.
+
+        Returns:
+            A list with `side` rows, each one a list of `side` integers.
+        """
+        side = self.side
+        return [
+            self.cells[i * side : (i + 1) * side].tolist() for i in range(side)
+        ]
+
+    @board.setter
+    def board(self, matrix):
+        """
+        Replaces every intersection with the ones from a matrix, forgetting
+        the moves played so far.
+
+        Args:
+            matrix: a list of `side` rows, each one with `side` integers in
+                    the set {-1, 0, 1}.
+        """
+        self.cells = array("b", chain.from_iterable(matrix))
+        self.history = []
+        self.winner, self.win_ply = 0, 0
+        for index, piece in enumerate(self.cells):
+            if piece and self.victory_at(divmod(index, self.side)):
+                self.winner = piece
+                break
+        self.rescore()
+
+        self.hash = 0
+        for index, piece in enumerate(self.cells):
+            if piece:
+                self.hash ^= self.keys[piece][index]
+        self.reset_frontier()
+
+    def zobrist_key(self, player):
+        """
+        Hashes the board along with the player to move, since the same
+        stones are a different position for the search if the other player
+        is the one to move.
+
+        Args:
+            player: a integer representing the player to move.
+
+        Returns:
+            A 64-bit integer.
+        """
+        return self.hash ^ self.turn_key if player == -1 else self.hash
+
+    def canonical_key(self, player):
+        """
+        Hashes the board as `zobrist_key` does, but the same for all eight
+        rotations and reflections of it: each symmetry is applied to the
+        stones, and the smallest of the eight hashes is kept.
+
+        Args:
+            player: a integer representing the player to move.
+
+        Returns:
+            A tuple with the 64-bit hash and the symmetry, as an index into
+            `Geometry.symmetries`, that turns the board into the one that
+            was hashed.
+        """
+        stones = [(i, j) for i, j in enumerate(self.cells) if j]
+        turn = self.turn_key if player == -1 else 0
+        best = None
+
+        for number, symmetry in enumerate(self.geometry.symmetries):
+            key = turn
+            for index, piece in stones:
+                key ^= self.keys[piece][symmetry[index]]
+            if best is None or key < best[0]:
+                best = (key, number)
+
+        return best
+
+    def nuple_factors(self, default=0.1):
+        """
+        Produces the right factors given a 1-uple initial value, as
+        explained in `Geometry.nuple_factors`.
+
+        Args:
+            default:    value of a single piece in the board matrix
+                        representation.
+
+        Returns:
+            Dictionary with length of n-uple as key and its
+            multiplicative factor as value.
+        """
+        return self.geometry.nuple_factors(default)
+
+    def diagonals(self, invert=True, board=None):
         """
         Creates lists with all the board matrix's diagonals, starting from the
         bottom-left element and going towards the top-right. Based on [1].
 
         Args:
             invert: inverts the board to create antidiagonals.
+            board:  the matrix representation for the board, if not the
+                    current one.
 
         Returns:
             All the diagonals from the matrix.
 
         [1] http://stackoverflow.com/a/23069625
         """
-        board = [i[::-1] for i in self.board] if invert else self.board
+        board = self.board if board is None else board
+        board = [i[::-1] for i in board] if invert else board
         diags, hgt, wdt = [], len(board), len(board[0])
 
         for i in range(hgt + wdt - 1):
@@ -111,28 +423,131 @@ class GomokuBoard:
     def victory(self):
         """
         Covers all the possible victory conditions given a board with some
-        configuration of stones.
+        configuration of stones. The winner is kept up to date by every move
+        and every undo, so this check is constant-time.
 
         Returns:
             True if there exists a set of five stones with the same color
             horizontally, vertically or diagonally aligned on the board,
             False otherwise.
         """
-        for board in [
-            self.board,
-            zip(*self.board),
-            self.diagonals(),
-            self.diagonals(invert=True),
-        ]:
-            for row in board:
-                lengths = (
-                    (piece, sum(1 for _ in group))
-                    for piece, group in groupby(row)
-                )
-                if any(i and j >= 5 for i, j in lengths):
-                    return True
+        return self.winner != 0
+
+    def victory_at(self, position):
+        """
+        Checks only the row, column and both diagonals that pass through a
+        single intersection, which is enough to find out whether the stone
+        placed there has just won the game.
+
+        Args:
+            position:   the board matrix's coordinates for the last play.
+
+        Returns:
+            True if the stone on the position is part of five or more
+            aligned stones of the same color, False otherwise.
+        """
+        x_coord, y_coord = position
+        index = x_coord * self.side + y_coord
+        cells = self.cells
+        player = cells[index]
+        if not player:
+            return False
+
+        through = zip(self.cell_lines[index], self.cell_slots[index])
+        for line_id, slot in through:
+            line = self.lines[line_id]
+            first = last = slot
+            while first > 0 and cells[line[first - 1]] == player:
+                first -= 1
+            while last < len(line) - 1 and cells[line[last + 1]] == player:
+                last += 1
+            if last - first >= 4:
+                return True
         return False
 
+    def runs_through(self, position, player):
+        """
+        Measures the unbroken rows of stones that a player would have along
+        each direction through an intersection, were a stone of theirs
+        placed on it.
+
+        Args:
+            position:   the board matrix's coordinates of the intersection.
+            player:     a integer representing a player.
+
+        Returns:
+            List with a tuple for each direction, containing the length of
+            the row and how many of its two ends are empty intersections.
+        """
+        x_coord, y_coord = position
+        index = x_coord * self.side + y_coord
+        cells = self.cells
+        runs = []
+
+        through = zip(self.cell_lines[index], self.cell_slots[index])
+        for line_id, slot in through:
+            line = self.lines[line_id]
+            first = last = slot
+            while first > 0 and cells[line[first - 1]] == player:
+                first -= 1
+            while last < len(line) - 1 and cells[line[last + 1]] == player:
+                last += 1
+            open_ends = (first > 0 and not cells[line[first - 1]]) + (
+                last < len(line) - 1 and not cells[line[last + 1]]
+            )
+            runs.append((last - first + 1, open_ends))
+
+        return runs
+
+    def make_move(self, player, position):
+        """
+        Places a stone on the desired position, remembering it so that the
+        move can be taken back later.
+
+        Args:
+            player:     a integer representing the player; 1 uses the black
+                        stones and -1, the white ones.
+            position:   the board matrix's coordinates for the play.
+        """
+        x_coord, y_coord = position
+        index = x_coord * self.side + y_coord
+        self.cells[index] = player
+        self.history.append(index)
+        self.hash ^= self.keys[player][index]
+        self.update_lines(index)
+
+        self.frontier.discard(index)
+        for i in self.neighbors[index]:
+            self.nearby[i] += 1
+            if not self.cells[i]:
+                self.frontier.add(i)
+
+        if not self.winner and self.victory_at(position):
+            self.winner, self.win_ply = player, len(self.history)
+
+    def undo_move(self):
+        """
+        Takes back the last move made on the board.
+
+        Returns:
+            The board matrix's coordinates of the removed stone.
+        """
+        if self.winner and len(self.history) == self.win_ply:
+            self.winner, self.win_ply = 0, 0
+
+        index = self.history.pop()
+        self.hash ^= self.keys[self.cells[index]][index]
+        self.cells[index] = 0
+        self.update_lines(index)
+
+        for i in self.neighbors[index]:
+            self.nearby[i] -= 1
+            if not self.nearby[i]:
+                self.frontier.discard(i)
+        if self.nearby[index]:
+            self.frontier.add(index)
+        return divmod(index, self.side)
+
     def place_stone(self, player, position):
         """
         Places a stone on the desired position if it is available.
@@ -142,8 +557,7 @@ class GomokuBoard:
                         stones and -1, the white ones.
             position:   the board matrix's coordinates for the play.
         """
-        x_coord, y_coord = position
-        self.board[x_coord][y_coord] = player
+        self.make_move(player, position)
 
     def is_empty_space(self, position):
         """
@@ -156,14 +570,19 @@ class GomokuBoard:
             True if the position is empty, False otherwise.
         """
         x_coord, y_coord = position
-        return self.board[x_coord][y_coord] == 0
+        return self.cells[x_coord * self.side + y_coord] == 0
 
     def clear(self):
         """
         Wipes all the plays from the board, which is equivalent to nullify all
         the contents of the board matrix's coordinates.
         """
-        self.board = [[0 for _ in range(self.side)] for _ in range(self.side)]
+        self.cells = array("b", bytes(self.side * self.side))
+        self.history = []
+        self.winner, self.win_ply = 0, 0
+        self.rescore()
+        self.hash = 0
+        self.reset_frontier()
 
     def draw(self):
         """
@@ -173,10 +592,7 @@ class GomokuBoard:
             True if all the board is filled and there has not been a winner,
             False otherwise.
         """
-        return (
-            all(all(i for i in row) for row in self.board)
-            and not self.victory()
-        )
+        return all(self.cells) and not self.victory()
 
     def neighbor_board(self, position, radius):
         """
@@ -190,30 +606,47 @@ class GomokuBoard:
             List of neighbors' coordinates.
         """
         x_coord, y_coord = position
-        neighbors = []
+        neighbors = self.geometry.neighbors(radius)
+        return [
+            divmod(i, self.side)
+            for i in neighbors[x_coord * self.side + y_coord]
+        ]
 
-        for i in range(1, radius + 1):
-            neighbors += list(
-                starmap(
-                    lambda a, b: (x_coord + a, y_coord + b),
-                    product((0, -i, +i), (0, -i, +i)),
-                )
-            )
+    def reset_frontier(self):
+        """
+        Counts, for every intersection, how many stones lie within `radius`
+        of it, and gathers the empty ones with at least one such stone. Both
+        are then kept up to date by every move and every undo.
+        """
+        self.nearby = array("i", [0]) * self.side ** 2
+        for index, piece in enumerate(self.cells):
+            if piece:
+                for i in self.neighbors[index]:
+                    self.nearby[i] += 1
 
-        return list(
-            filter(
-                lambda x: x != position
-                and all((0 <= j < self.side) for j in x),
-                neighbors,
-            )
-        )
+        self.frontier = {
+            i
+            for i, count in enumerate(self.nearby)
+            if count and not self.cells[i]
+        }
 
-    def empty_neighbors(self, board, position, radius):
+    def candidate_moves(self):
+        """
+        Lists the moves worth searching: the empty intersections near some
+        stone, or all of them if there is none.
+
+        Returns:
+            List of coordinates, sorted by row and then column.
+        """
+        if not self.frontier:
+            return self.filled_spaces(0)
+        return [divmod(i, self.side) for i in sorted(self.frontier)]
+
+    def empty_neighbors(self, position, radius):
         """
         Checks if neighbors are empty given a starting coordinate.
 
         Args:
-            board:      the matrix representation for the board.
             position:   the board matrix's coordinates for the last play.
             radius:     depth of the neighbor search around the coordinate.
 
@@ -221,9 +654,9 @@ class GomokuBoard:
             List of empty neighbors' coordinates.
         """
         return [
-            (i, j)
-            for i, j in self.neighbor_board(position, radius)
-            if not board[i][j]
+            pos
+            for pos in self.neighbor_board(position, radius)
+            if self.is_empty_space(pos)
         ]
 
     def filled_spaces(self, player):
@@ -232,30 +665,66 @@ class GomokuBoard:
         player, or are empty (if the player argument is zero).
 
         Args:
-            board:  the matrix representation for the board.
             player: a integer representing the player, or its absence.
 
         Returns:
             List with the coordinates of the valid places.
         """
-        size = enumerate(self.board)
-        _list = [
-            [(i, j) for j, _ in size if self.board[i][j] == player]
-            for i, _ in size
+        return [
+            divmod(i, self.side)
+            for i, piece in enumerate(self.cells)
+            if piece == player
         ]
 
-        return list(chain.from_iterable(_list))
-
-    def row_values(self, board, player):
+    def line_value(self, line, player):
         """
-        Calculates a numeric 'score' for the board state given
-        the horizontally aligned stones of the same color.
+        Calculates a numeric 'score' for a single row of stones.
 
         This calculation takes in account consecutive groupings
         (n-uples), n-uples (with n > 3) that need only one stone
         to be completed, generally in the middle, and how many
         "open sides" there are for a combination.
 
+        Args:
+            line:   sequence of integers in the set {-1, 0, 1}.
+            player: a integer representing a player.
+
+        Returns:
+            An integer that reflects these factors, or WIN if the player
+            is one move away from a victory on this line.
+        """
+        if not sum(line):
+            return 0
+
+        open_sides = {2: 1, 1: 1 / 2, 0: 0.1}
+        value = 0
+
+        row = [2] + list(line) + [2]
+        lengths = [
+            [piece, sum(1 for _ in group)] for piece, group in groupby(row)
+        ]
+
+        for i in range(1, len(lengths) - 1):
+            sides = lengths[i - 1][0] == 0 + lengths[i + 1][0] == 0
+            if (
+                lengths[i] == [0, 1]
+                and lengths[i - 1][1] + lengths[i + 1][1] >= 4
+                and lengths[i - 1][0] == lengths[i + 1][0] == player
+            ):
+                return WIN
+            if lengths[i][0] == player:
+                if lengths[i][1] >= 4 and sides:
+                    return WIN
+                length = min(lengths[i][1], len(self.factors))
+                value += self.factors[length] * open_sides[sides]
+
+        return value
+
+    def row_values(self, board, player):
+        """
+        Calculates a numeric 'score' for the board state given
+        the horizontally aligned stones of the same color.
+
         Args:
             board:  the matrix representation for the board.
             player: a integer representing a player.
@@ -263,27 +732,13 @@ class GomokuBoard:
         Returns:
             An integer that reflects these factors.
         """
-        open_sides = {2: 1, 1: 1 / 2, 0: 0.1}
         value = 0
 
-        for row in (i for i in board if sum(i)):
-            row = [2] + list(row) + [2]
-            lengths = [
-                [piece, sum(1 for _ in group)] for piece, group in groupby(row)
-            ]
-
-            for i in range(1, len(lengths) - 1):
-                sides = lengths[i - 1][0] == 0 + lengths[i + 1][0] == 0
-                if (
-                    lengths[i] == [0, 1]
-                    and lengths[i - 1][1] + lengths[i + 1][1] >= 4
-                    and lengths[i - 1][0] == lengths[i + 1][0] == player
-                ):
-                    return 2 ** 32
-                if lengths[i][0] == player:
-                    if lengths[i][1] >= 4 and sides:
-                        return 2 ** 32
-                    value += self.factors[lengths[i][1]] * open_sides[sides]
+        for row in board:
+            line = self.line_value(row, player)
+            if line == WIN:
+                return WIN
+            value += line
 
         return value
 
@@ -313,14 +768,15 @@ class GomokuBoard:
         Returns:
             An integer that reflects these factors.
         """
-        return self.row_values(self.diagonals(board), player) + self.row_values(
-            self.diagonals(invert=True), player
-        )
+        return self.row_values(
+            self.diagonals(invert=False, board=board), player
+        ) + self.row_values(self.diagonals(board=board), player)
 
-    def evaluate(self, board, player):
+    def full_evaluate(self, board, player):
         """
         Calculates a numeric 'score' for the board state given the
-        combinations with already placed stones.
+        combinations with already placed stones, going through every line
+        of a board matrix.
 
         In the case of Gomoku, one n-uple should always be worth more
         than all the (n-1)-uples combined (that can be calculated through
@@ -343,6 +799,120 @@ class GomokuBoard:
 
         return value
 
+    def rescore(self):
+        """
+        Recomputes the score of every line of the board from scratch, along
+        with the totals for each direction that `evaluate` relies on.
+        """
+        self.line_scores = {1: [], -1: []}
+        self.totals = {1: [0] * len(DIRECTIONS), -1: [0] * len(DIRECTIONS)}
+        self.wins = {1: [0] * len(DIRECTIONS), -1: [0] * len(DIRECTIONS)}
+
+        for line, direction in zip(self.lines, self.directions):
+            pieces = [self.cells[i] for i in line]
+            for player in (1, -1):
+                score = self.line_value(pieces, player)
+                self.line_scores[player].append(score)
+                self.add_score(player, direction, score)
+
+    def add_score(self, player, direction, score, sign=1, tally=None):
+        """
+        Adds (or removes, if sign is negative) the score of a line to the
+        total of its direction.
+
+        Args:
+            player:     a integer representing a player.
+            direction:  index of the line's direction in DIRECTIONS.
+            score:      the value of the line for that player.
+            sign:       1 to add the score, -1 to remove it.
+            tally:      tuple with the totals and winning lines to change,
+                        if not the ones of the board.
+        """
+        totals, wins = (self.totals, self.wins) if tally is None else tally
+        if score == WIN:
+            wins[player][direction] += sign
+        else:
+            totals[player][direction] += sign * round(score * SCALE)
+
+    def update_lines(self, index):
+        """
+        Rescores the four lines that pass through an intersection, after a
+        stone has been placed or removed there.
+
+        Args:
+            index:  position of the intersection in the flat array.
+        """
+        cells = self.cells
+        for line_id in self.cell_lines[index]:
+            direction = self.directions[line_id]
+            pieces = [cells[i] for i in self.lines[line_id]]
+            for player in (1, -1):
+                scores = self.line_scores[player]
+                self.add_score(player, direction, scores[line_id], sign=-1)
+                scores[line_id] = self.line_value(pieces, player)
+                self.add_score(player, direction, scores[line_id])
+
+    def evaluate(self, player):
+        """
+        Calculates the same 'score' as `full_evaluate`, but from the line
+        scores kept up to date by every move, in constant time.
+
+        Args:
+            player: a integer representing a player.
+
+        Returns:
+            An integer that takes in account the groupings of stones
+            with the same color, representing their contribution to
+            a possible victory.
+        """
+        value = combine(self.totals, self.wins, player)
+
+        if self.check:
+            expected = self.full_evaluate(self.board, player)
+            assert isclose(value, expected, rel_tol=1e-9, abs_tol=1e-6), (
+                "Incremental score {} differs from {}".format(value, expected)
+            )
+
+        return value
+
+    def evaluate_batch(self, moves, player):
+        """
+        Calculates what `evaluate` would return after each of many moves,
+        without playing them: only the four lines through each move are
+        scored again, on top of the scores kept by the board.
+
+        Args:
+            moves:  list of coordinates of empty intersections.
+            player: a integer representing the player placing the stones,
+                    and whose point of view is taken.
+
+        Returns:
+            Iterator over the scores, in the same order as the moves. They
+            are calculated as they are asked for, so that a search that
+            stops early does not pay for the rest.
+        """
+        cells, side = self.cells, self.side
+
+        for x_coord, y_coord in moves:
+            index = x_coord * side + y_coord
+            tally = (
+                {i: j[:] for i, j in self.totals.items()},
+                {i: j[:] for i, j in self.wins.items()},
+            )
+            for line_id in self.cell_lines[index]:
+                direction = self.directions[line_id]
+                pieces = [
+                    player if i == index else cells[i]
+                    for i in self.lines[line_id]
+                ]
+                for who in (1, -1):
+                    old = self.line_scores[who][line_id]
+                    new = self.line_value(pieces, who)
+                    self.add_score(who, direction, old, -1, tally)
+                    self.add_score(who, direction, new, 1, tally)
+
+            yield combine(tally[0], tally[1], player)
+
     def rnd_board(self):
         """
         Produces a randomly populated board for debugging purposes, overriding
@@ -351,3 +921,81 @@ class GomokuBoard:
         self.board = [
             [randint(-1, 1) for _ in range(self.side)] for _ in range(self.side)
         ]
+
+
+def combine(totals, wins, player):
+    """
+    Adds up the totals of each direction into a score for the board.
+
+    Args:
+        totals: dictionary mapping each player to the sum of the scores of
+                the lines along each direction, in millionths.
+        wins:   dictionary mapping each player to how many lines along each
+                direction are one move away from a victory.
+        player: a integer representing the player whose point of view is
+                taken.
+
+    Returns:
+        The difference between the scores of both players.
+    """
+
+    def direction_value(direction, who):
+        if wins[who][direction]:
+            return WIN
+        return totals[who][direction] / SCALE
+
+    value = 0
+    # grouped like rows, columns and diagonals in `full_evaluate`, so that
+    # rounding around WIN happens in the same places
+    for group in ((0,), (1,), (2, 3)):
+        value += sum(direction_value(i, player) for i in group) - sum(
+            direction_value(i, -player) for i in group
+        )
+
+    return value
+
+
+def consistency_check(side=15, trials=100, kind=None):
+    """
+    Compares the incremental scores against full recomputations. Each
+    random board from `rnd_board` is rebuilt one stone at a time in a
+    random order, and then taken apart again, checking `evaluate` at every
+    step.
+
+    Args:
+        side:   size of the square's side for the board.
+        trials: how many random boards should be checked.
+        kind:   class of the board to be checked, GomokuBoard if None.
+
+    Raises:
+        AssertionError if any incremental score is different from the one
+        calculated from scratch.
+    """
+    kind = GomokuBoard if kind is None else kind
+    reference, replay = GomokuBoard(side), kind(side, check=True)
+
+    for _ in range(trials):
+        reference.rnd_board()
+        stones = [
+            (piece, divmod(i, side))
+            for i, piece in enumerate(reference.cells)
+            if piece
+        ]
+        shuffle(stones)
+
+        replay.clear()
+        for piece, position in stones:
+            replay.make_move(piece, position)
+            replay.evaluate(piece)
+
+        for player in (1, -1):
+            assert isclose(
+                reference.evaluate(player),
+                replay.evaluate(player),
+                rel_tol=1e-9,
+                abs_tol=1e-6,
+            )
+
+        while replay.history:
+            replay.undo_move()
+            replay.evaluate(1)
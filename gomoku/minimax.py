@@ -10,12 +10,44 @@ of winning, and its opponent is trying to minimize that same chance
 """
 
 from __future__ import absolute_import
-from copy import deepcopy
-from itertools import chain
-from random import choice
+from time import time
 
+from gomoku_board import VICTORY
+from ordering import MoveOrdering
+from threats import forced_win
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
 
-def ab_pruning(board, depth, alpha, beta, player):
+
+class SearchTimeout(Exception):
+    """Raised inside the search once its deadline has passed."""
+
+
+def proven(score):
+    """
+    Tells whether a score comes from a victory on the board, rather than
+    from the evaluation of lines that may still be blocked, however high.
+
+    Args:
+        score:  a score returned by the search.
+
+    Returns:
+        True if either player is bound to win.
+    """
+    return abs(score) >= VICTORY // 2
+
+
+def ab_pruning(
+    board,
+    depth,
+    alpha,
+    beta,
+    player,
+    table=None,
+    deadline=None,
+    ordering=None,
+    book=None,
+    stats=None,
+):
     """
     Improvement over the naïve minimax algorithm that seeks to decrease
     the number of nodes evaluated by the algorithm through pruning: if a
@@ -23,65 +55,298 @@ def ab_pruning(board, depth, alpha, beta, player):
     analysed node, then it needs not be analysed and as such, may be
     discarded. Hence, deeper searches may be performed.
 
+    Every child is visited by playing its move on the very same board and
+    taking it back afterwards, so the board is left untouched on return.
+    If a transposition table is given, positions already searched deep
+    enough are answered from it, and the best move stored for a position is
+    always tried first. The other moves are tried in the order given by
+    `ordering`, or by their coordinates if it is None. An opening book, if
+    given, answers the positions it knows from a search at least as deep,
+    and keeps the exact results of deep enough searches if it is learning.
+
     Args:
         board:  a GomokuBoard object.
         depth:  maximum depth before end of recursion; deeper searches
                 may perform better, although at a cost.
         alpha:  maximum score that the maximizing player is assured of.
         beta:   minimum score that the minimizing player is assured of.
-        player: a integer representing the maximizing player.
+        player: a integer representing the player to move; scores are
+                seen from the side of -1, which maximizes them, while 1
+                minimizes them.
+        table:  a TranspositionTable shared by the whole search, or None.
+        deadline:   time, as given by `time.time`, after which the search
+                    is abandoned by raising SearchTimeout; the moves played
+                    on the board are not taken back in that case.
+        ordering:   a MoveOrdering shared by the whole search, or None.
+        book:   an OpeningBook shared by the whole search, or None.
+        stats:  a SearchStats that counts what the search does, or None.
 
     Returns:
         A tuple containing the score for a given board, and the best move
         evaluated by the algorithm.
     """
-    filled_spots = list(
-        chain.from_iterable(board.filled_spaces(i) for i in [1, -1])
-    )
-    empty_neighbors = list(
-        chain.from_iterable(
-            board.empty_neighbors(board.board, i, 1) for i in filled_spots
-        )
-    )
+    if deadline is not None and time() > deadline:
+        raise SearchTimeout
+    if stats is not None:
+        board, ordering = stats.enter(board, ordering, depth)
+
+    # only nodes as deep as the shallowest search it keeps look at the book
+    if book is not None and depth >= book.min_depth:
+        known = book.probe(board, player)
+        if known is not None and known.depth >= depth:
+            return known.score, known.move
+
+    entry, bounds = None, (alpha, beta)
+    if table is not None and depth > 0:
+        entry = table.probe(board.zobrist_key(player))
+        if stats is not None:
+            stats.probed(entry, depth)
 
-    all_empty = board.filled_spaces(0)
-    moves = sorted(list(set(all_empty).intersection(empty_neighbors)))
+    if entry is not None and entry.depth >= depth:
+        if entry.bound == EXACT:
+            return entry.score, entry.move
+        if entry.bound == LOWER:
+            alpha = max(alpha, entry.score)
+        elif entry.bound == UPPER:
+            beta = min(beta, entry.score)
+        if alpha >= beta:
+            return entry.score, entry.move
 
-    final_move_list = all_empty if not moves else moves
+    final_move_list = board.candidate_moves()
 
     if depth == 0:
-        final_val = board.evaluate(board.board, player)
+        final_val = board.evaluate(-1)
         if not final_move_list or board.draw():
             raise SystemExit("Draw!")
         if board.victory():
-            final_val += 2 ** 32
+            final_val -= board.winner * VICTORY
         return final_val, final_move_list[0]
 
     move = None
+    hash_move = entry.move if entry is not None else None
+    if ordering is not None:
+        final_move_list = ordering.order(
+            board, final_move_list, player, depth, hash_move
+        )
+    elif hash_move in final_move_list:
+        final_move_list.remove(hash_move)
+        final_move_list.insert(0, hash_move)
+
+    # children of a node one ply above the leaves are scored all at once
+    leaves = None
+    if depth == 1 and not board.winner and board.cells.count(0) > 1:
+        leaves = iter(board.evaluate_batch(final_move_list, player))
+
+    for index, new_move in enumerate(final_move_list):
+        if leaves is not None:
+            runs = board.runs_through(new_move, player)
+            if any(length >= 5 for length, _ in runs):
+                return -player * VICTORY, new_move
+            temp_score = -player * next(leaves)
+            if stats is not None:
+                stats.leaf()
+        else:
+            board.make_move(player, new_move)
+
+            if board.victory():
+                board.undo_move()
+                return -player * VICTORY, new_move
+
+            temp_score = ab_pruning(
+                board,
+                depth - 1,
+                alpha,
+                beta,
+                -player,
+                table,
+                deadline,
+                ordering,
+                book,
+                stats,
+            )[0]
+            board.undo_move()
+
+        if player == -1 and temp_score > alpha:
+            alpha = temp_score
+            move = new_move
+        elif player == 1 and temp_score < beta:
+            beta = temp_score
+            move = new_move
+
+        if alpha >= beta:
+            if ordering is not None:
+                ordering.cutoff(new_move, depth)
+            if stats is not None:
+                stats.cutoff(index)
+            break
+
+    score = alpha if player == -1 else beta
 
-    while final_move_list:
-        new_move = choice(final_move_list)
-        temp_board = deepcopy(board)
-        temp_board.place_stone(player, new_move)
+    if score <= bounds[0]:
+        bound = UPPER
+    elif score >= bounds[1]:
+        bound = LOWER
+    else:
+        bound = EXACT
 
-        if temp_board.victory():
-            return 2 ** 32, new_move
+    if table is not None:
+        table.store(board.zobrist_key(player), depth, bound, score, move)
+    if book is not None and bound == EXACT:
+        book.record(board, player, depth, score, move)
+
+    return score, move
+
+
+def principal_variation(board, player, table, depth):
+    """
+    Follows the best moves stored in a transposition table from the current
+    position, which is the line of play the search expects.
+
+    Args:
+        board:  a GomokuBoard object.
+        player: a integer representing the player to move.
+        table:  a TranspositionTable filled by a previous search.
+        depth:  maximum number of moves in the line.
+
+    Returns:
+        List of coordinates, alternating between both players.
+    """
+    line = []
+    while len(line) < depth and not board.victory():
+        entry = table.probe(board.zobrist_key(player))
+        if entry is None or entry.move is None:
+            break
+        if not board.is_empty_space(entry.move):
+            break
+        board.make_move(player, entry.move)
+        line.append(entry.move)
+        player = -player
+
+    for _ in line:
+        board.undo_move()
+    return line
+
+
+def iterative_deepening(
+    board,
+    player,
+    think_ms,
+    table=None,
+    max_depth=None,
+    ordering=None,
+    pool=None,
+    book=None,
+    vcf_depth=0,
+    vct_depth=0,
+    stats=None,
+    search=ab_pruning,
+    deadline=None,
+):
+    """
+    Searches with increasing depths until the time budget runs out, and
+    answers with the result of the deepest search that was completed. Every
+    search stores its best moves in the transposition table, so the next,
+    deeper one starts by trying the principal variation found before it,
+    which makes it prune much more.
+
+    The first search, one ply deep, always runs to completion, so that
+    there is a move to answer with even if the budget is too small. A
+    position found in the opening book is answered at once. Before the
+    first search, up to a quarter of the budget is spent looking for a
+    forced victory over threats alone, which is played if found. The
+    deepening only stops before the budget runs out once a search proves a
+    victory for either player.
+
+    Args:
+        board:      a GomokuBoard object.
+        player:     a integer representing the player to move.
+        think_ms:   wall-clock budget for the move, in milliseconds.
+        table:      a TranspositionTable, possibly filled by earlier moves of
+                    the same game; a new one is used if None.
+        max_depth:  deepest search to try, or None to only stop on time.
+        ordering:   a MoveOrdering whose killers and history are carried
+                    across the iterations; a new one is used if None.
+        pool:       a ParallelSearch that splits the moves at the root among
+                    processes, running `search` in each of them, or None to
+                    search in this process alone.
+        book:       an OpeningBook consulted before searching, and by the
+                    search, or None.
+        vcf_depth:  how many fours in a row the threat-space search may
+                    make; zero skips it.
+        vct_depth:  how many fours and open threes in a row the threat-space
+                    search may make; zero skips it.
+        stats:      a SearchStats that counts what the search does, in
+                    every process, and is told of every depth completed, or
+                    None.
+        search:     the search run at each depth, called as `ab_pruning`,
+                    such as a `negamax.PVSearch`.
+        deadline:   end of the search in place of the one given by
+                    `think_ms`, such as a `ponder.Deadline`, or None.
+
+    Returns:
+        A tuple containing the score for the board, the best move and the
+        depth of the search that found it.
+    """
+    if book is not None:
+        known = book.probe(board, player)
+        if known is not None and known.move is not None:
+            return known.score, known.move, known.depth
+
+    start = time()
+    deadline = start + think_ms / 1000 if deadline is None else deadline
+    if vcf_depth or vct_depth:
+        line = forced_win(
+            board, player, vcf_depth, vct_depth, start + think_ms / 4000
+        )
+        if line is not None:
+            return -player * VICTORY, line[0], len(line)
+    table = TranspositionTable() if table is None else table
+    table.new_search()
+    ordering = MoveOrdering() if ordering is None else ordering
 
-        temp_score = ab_pruning(temp_board, depth - 1, alpha, beta, -player)[0]
+    empty = board.cells.count(0)
+    max_depth = empty if max_depth is None else min(max_depth, empty)
+    ply = len(board.history)
+    score, move, depth = None, None, 0
 
-        if player == -1:
-            if temp_score > alpha:
-                alpha = temp_score
-                move = new_move
-            if alpha >= beta:
-                break
-        elif player == 1:
-            if temp_score < beta:
-                beta = temp_score
-                move = new_move
-            if alpha >= beta:
-                break
+    while depth < max_depth:
+        try:
+            if pool is None:
+                score, move = search(
+                    board,
+                    depth + 1,
+                    float("-inf"),
+                    float("inf"),
+                    player,
+                    table,
+                    deadline if depth else None,
+                    ordering,
+                    book,
+                    stats,
+                )
+            else:
+                score, move = pool.search(
+                    board,
+                    depth + 1,
+                    player,
+                    table,
+                    deadline if depth else None,
+                    ordering,
+                    book,
+                    stats,
+                    search,
+                )
+        except SearchTimeout:
+            while len(board.history) > ply:
+                board.undo_move()
+            break
 
-        final_move_list.remove(new_move)
+        depth += 1
+        if stats is not None:
+            stats.iteration(depth, score, move)
+        if book is not None:
+            book.record(board, player, depth, score, move)
+        if proven(score) or time() >= deadline:
+            break
 
-    return alpha if player == -1 else beta, move
+    return score, move, depth
@@ -0,0 +1,453 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""negamax.py
+
+Principal variation search [1], written as negamax: every node maximizes
+the score from the point of view of the player to move, which is the
+negation of the score of its children, so there is a single branch for
+both players. Only the first move of a node, which is expected to be the
+best one, is searched with the whole window; the others are searched with
+a null window, just wide enough to tell whether they are better than the
+best so far, and searched again with the whole window when they are.
+
+The tree is walked with an explicit stack of frames instead of recursion,
+and the moves that led to the best score of each node are kept, so that
+the search returns the whole principal variation; below a node answered by
+the table or the book, it goes on with the best moves stored in the table.
+Between iterations of iterative deepening, the search starts with an
+aspiration window around the score of the previous iteration, reopened on
+the side that it falls out of.
+
+Scores are the same as those of `minimax.ab_pruning` for the same depth,
+and are stored in the transposition table the same way, so that both
+searches may share one.
+
+Every node but the leaves searches its later moves with a null window. On
+the positions of `benchmark.py`, with the table and move ordering, that
+makes for about 5% fewer nodes than `ab_pruning` at depth 3, 20% fewer at
+depth 4 and 8% fewer at depth 5. The gain is smaller near the leaves: a
+node one ply above them scores its children all at once, and stops at the
+first one that reaches beta, which is the same with either window.
+
+[1] https://www.chessprogramming.org/Principal_Variation_Search
+"""
+
+from __future__ import absolute_import
+from math import nextafter
+from time import time
+
+from gomoku_board import VICTORY
+from minimax import SearchTimeout, principal_variation
+from transposition import EXACT, LOWER, UPPER
+
+INF = float("inf")
+
+# bounds of a score from the point of view of player 1, who minimizes it
+FLIPPED = {EXACT: EXACT, LOWER: UPPER, UPPER: LOWER}
+
+
+class Frame:  # pylint: disable=R0902,R0903
+    """A node of the search whose children are being searched."""
+
+    __slots__ = (
+        "depth",
+        "alpha",
+        "beta",
+        "player",
+        "window",
+        "moves",
+        "index",
+        "move",
+        "null",
+        "score",
+        "best",
+        "line",
+    )
+
+    def __init__(self, depth, alpha, beta, player, moves):
+        """
+        Inits Frame before its first child is searched.
+
+        Args:
+            depth:  remaining depth of the search at the node.
+            alpha:  score the player to move is assured of.
+            beta:   score the opponent is assured of, negated.
+            player: a integer representing the player to move.
+            moves:  the moves of the node, in the order they are tried.
+        """
+        self.depth = depth
+        self.alpha, self.beta = alpha, beta
+        self.window = (alpha, beta)
+        self.player = player
+        self.moves = moves
+        self.index = 0
+        self.move = None
+        self.null = False
+        self.score = -INF
+        self.best = None
+        self.line = []
+
+
+class PVSearch:
+    """
+    Principal variation search, called like `minimax.ab_pruning`, so that
+    it may be given to `minimax.iterative_deepening`.
+    """
+
+    def __init__(self, aspiration=1000.0):
+        """
+        Inits PVSearch with no previous search.
+
+        Args:
+            aspiration: half the width of the window around the score of
+                        the previous iteration, or zero for none.
+        """
+        self.aspiration = aspiration
+        self.root, self.scores = None, {}
+        self.line = []
+        self.board = self.table = self.deadline = None
+        self.ordering = self.book = self.stats = None
+
+    def __call__(
+        self,
+        board,
+        depth,
+        alpha,
+        beta,
+        player,
+        table=None,
+        deadline=None,
+        ordering=None,
+        book=None,
+        stats=None,
+    ):
+        """
+        Searches the board to a given depth.
+
+        Args:
+            board:  a GomokuBoard object.
+            depth:  maximum depth before the end of the search.
+            alpha:  maximum score that the maximizing player is assured of.
+            beta:   minimum score that the minimizing player is assured of.
+            player: a integer representing the player to move; scores are
+                    seen from the side of -1, which maximizes them, while 1
+                    minimizes them.
+            table:  a TranspositionTable shared by the whole search, or None.
+            deadline:   time, as given by `time.time`, after which the search
+                        is abandoned by raising SearchTimeout; the moves
+                        played on the board are not taken back in that case.
+            ordering:   a MoveOrdering shared by the whole search, or None.
+            book:   an OpeningBook shared by the whole search, or None.
+            stats:  a SearchStats that counts what the search does, or None.
+
+        Returns:
+            A tuple containing the score for the board, and the best move
+            found; the whole principal variation is kept in `line`.
+        """
+        self.board, self.table, self.deadline = board, table, deadline
+        self.ordering, self.book, self.stats = ordering, book, stats
+
+        # scores from the point of view of the player to move
+        low, high = (alpha, beta) if player == -1 else (-beta, -alpha)
+        key = board.zobrist_key(player)
+        if key != self.root:
+            self.root, self.scores = key, {}
+
+        # scores swing between odd and even depths, as the last ply is
+        # always of the player that ends up ahead: the window is centered
+        # on the score of the last search with the same parity
+        lower, upper = low, high
+        previous = self.scores.get(depth - 2)
+        if previous is not None and self.aspiration:
+            lower = max(low, previous - self.aspiration)
+            upper = min(high, previous + self.aspiration)
+
+        while True:
+            score, line = self.search(depth, lower, upper, player)
+            if score <= lower and lower > low:
+                lower = low
+            elif score >= upper and upper < high:
+                upper = high
+            else:
+                break
+
+        self.scores[depth], self.line = score, line
+        return -player * score, line[0] if line else None
+
+    def search(self, depth, alpha, beta, player):
+        """
+        Walks the tree below the board without recursion.
+
+        Args:
+            depth:  maximum depth before the end of the search.
+            alpha:  score the player to move is assured of.
+            beta:   score the opponent is assured of, negated.
+            player: a integer representing the player to move.
+
+        Returns:
+            A tuple with the score from the point of view of the player to
+            move, and the principal variation.
+        """
+        node = self.open(depth, alpha, beta, player)
+        if not isinstance(node, Frame):
+            return node
+
+        # the board may have been replaced by its stand-in when profiling
+        board = self.board
+        stack, result = [node], None
+        while stack:
+            frame = stack[-1]
+
+            if result is not None:
+                score, line = -result[0], result[1]
+                result = None
+                if frame.null and frame.alpha < score < frame.beta:
+                    # better than the best move so far: search it again
+                    frame.null = False
+                    child = self.open(
+                        frame.depth - 1, -frame.beta, -score, -frame.player
+                    )
+                    if isinstance(child, Frame):
+                        stack.append(child)
+                    else:
+                        result = child
+                    continue
+
+                board.undo_move()
+                if score > frame.score:
+                    frame.score, frame.best = score, frame.move
+                    frame.line = [frame.move] + line
+                    frame.alpha = max(frame.alpha, score)
+                if frame.alpha >= frame.beta:
+                    self.cutoff(frame)
+                    frame.index = len(frame.moves)
+
+            if frame.index < len(frame.moves):
+                frame.move = frame.moves[frame.index]
+                frame.index += 1
+                board.make_move(frame.player, frame.move)
+                if board.victory():
+                    board.undo_move()
+                    stack.pop()
+                    result = (VICTORY, [frame.move])
+                    continue
+
+                frame.null = frame.index > 1
+                high = (
+                    nextafter(frame.alpha, INF) if frame.null else frame.beta
+                )
+                child = self.open(
+                    frame.depth - 1, -high, -frame.alpha, -frame.player
+                )
+                if isinstance(child, Frame):
+                    stack.append(child)
+                else:
+                    result = child
+                continue
+
+            stack.pop()
+            result = self.close(frame)
+
+        return result
+
+    def open(self, depth, alpha, beta, player):
+        """
+        Starts searching a node: answers it from the book or the table, or
+        scores it if it is a leaf or just above the leaves.
+
+        Args:
+            depth:  remaining depth of the search at the node.
+            alpha:  score the player to move is assured of.
+            beta:   score the opponent is assured of, negated.
+            player: a integer representing the player to move.
+
+        Returns:
+            A tuple with the score of the node, from the point of view of
+            the player to move, and its principal variation; or a Frame for
+            the search of its children.
+        """
+        stats = self.stats
+        if self.deadline is not None and time() > self.deadline:
+            raise SearchTimeout
+        if stats is not None:
+            self.board, self.ordering = stats.enter(
+                self.board, self.ordering, depth
+            )
+        board = self.board
+
+        book = self.book
+        if book is not None and depth >= book.min_depth:
+            known = book.probe(board, player)
+            if known is not None and known.depth >= depth:
+                return -player * known.score, self.hit(
+                    known.move, depth, player
+                )
+
+        entry = None
+        if self.table is not None and depth > 0:
+            entry = self.table.probe(board.zobrist_key(player))
+            if stats is not None:
+                stats.probed(entry, depth)
+
+        if entry is not None and entry.depth >= depth:
+            score = -player * entry.score
+            bound = entry.bound if player == -1 else FLIPPED[entry.bound]
+            if bound == EXACT:
+                return score, self.hit(entry.move, depth, player)
+            if bound == LOWER:
+                alpha = max(alpha, score)
+            elif bound == UPPER:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score, self.hit(entry.move, depth, player)
+
+        moves = board.candidate_moves()
+        if depth == 0:
+            score = board.evaluate(-1)
+            if not moves or board.draw():
+                raise SystemExit("Draw!")
+            if board.victory():
+                score -= board.winner * VICTORY
+            return -player * score, []
+
+        hash_move = entry.move if entry is not None else None
+        if self.ordering is not None:
+            moves = self.ordering.order(board, moves, player, depth, hash_move)
+        elif hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+
+        frame = Frame(depth, alpha, beta, player, moves)
+        if depth == 1 and not board.winner and board.cells.count(0) > 1:
+            # children of a node one ply above the leaves are scored at once
+            leaves = iter(board.evaluate_batch(moves, player))
+            for move in moves:
+                frame.index += 1
+                runs = board.runs_through(move, player)
+                if any(length >= 5 for length, _ in runs):
+                    return VICTORY, [move]
+                score = next(leaves)
+                if stats is not None:
+                    stats.leaf()
+                if score > frame.score:
+                    frame.score, frame.best = score, move
+                    frame.line = [move]
+                    frame.alpha = max(frame.alpha, score)
+                if frame.alpha >= frame.beta:
+                    frame.move = move
+                    self.cutoff(frame)
+                    break
+            return self.close(frame)
+
+        return frame
+
+    def hit(self, move, depth, player):
+        """
+        Finds the principal variation of a node answered by the book or the
+        table, which only give its first move, by following the best moves
+        stored in the table after it.
+
+        Args:
+            move:   the move of the book or the table, which may be None.
+            depth:  remaining depth of the search at the node.
+            player: a integer representing the player to move.
+
+        Returns:
+            List of coordinates, empty if there is no move.
+        """
+        board = self.board
+        if move is None or not board.is_empty_space(move):
+            return []
+        if self.table is None or depth < 2:
+            return [move]
+
+        board.make_move(player, move)
+        line = [move] + principal_variation(
+            board, -player, self.table, depth - 1
+        )
+        board.undo_move()
+        return line
+
+    def cutoff(self, frame):
+        """
+        Learns from the move that pruned the rest of a node.
+
+        Args:
+            frame:  the Frame of the node, whose last move was the one.
+        """
+        if self.ordering is not None:
+            self.ordering.cutoff(frame.move, frame.depth)
+        if self.stats is not None:
+            self.stats.cutoff(frame.index - 1)
+
+    def close(self, frame):
+        """
+        Finishes a node, storing its score in the table and the book.
+
+        Args:
+            frame:  the Frame of the node, with all its children searched.
+
+        Returns:
+            A tuple with the score of the node, from the point of view of
+            the player to move, and its principal variation.
+        """
+        score, player = frame.score, frame.player
+        if score <= frame.window[0]:
+            bound = UPPER
+        elif score >= frame.window[1]:
+            bound = LOWER
+        else:
+            bound = EXACT
+
+        # as stored by ab_pruning: seen from the side of -1
+        if player == 1:
+            bound = FLIPPED[bound]
+        if self.table is not None:
+            self.table.store(
+                self.board.zobrist_key(player),
+                frame.depth,
+                bound,
+                -player * score,
+                frame.best,
+            )
+        if self.book is not None and bound == EXACT:
+            self.book.record(
+                self.board, player, frame.depth, -player * score, frame.best
+            )
+
+        return score, frame.line
+
+
+def pvs(
+    board,
+    depth,
+    alpha,
+    beta,
+    player,
+    table=None,
+    ordering=None,
+    stats=None,
+):
+    """
+    Searches a board once with principal variation search.
+
+    Args:
+        board:      a GomokuBoard object.
+        depth:      maximum depth before the end of the search.
+        alpha:      maximum score that the maximizing player is assured of.
+        beta:       minimum score that the minimizing player is assured of.
+        player:     a integer representing the player to move.
+        table:      a TranspositionTable, or None.
+        ordering:   a MoveOrdering, or None.
+        stats:      a SearchStats, or None.
+
+    Returns:
+        A tuple with the score of the board, as seen by `ab_pruning`, and
+        the principal variation.
+    """
+    search = PVSearch(aspiration=0)
+    score, _ = search(
+        board, depth, alpha, beta, player, table, None, ordering, None, stats
+    )
+    return score, search.line
@@ -0,0 +1,236 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""numpy_board.py
+
+A GomokuBoard that scores every line of the board at once with NumPy,
+instead of keeping the score of each line up to date with Python code on
+every move. Its intersections are read as an int8 array that shares memory
+with the flat array of the board, so moves cost nothing more than usual.
+
+Each line is gathered into a row of a matrix through a table of indices
+computed once, padded at both ends with a marker that is neither a stone
+nor an empty intersection. The rows of stones of a player are then found
+at once by comparing neighboring columns, and their scores are added up
+per line in the same order as `GomokuBoard.line_value` does, so the totals
+and `evaluate` are exactly the same as the pure-Python ones.
+"""
+
+from __future__ import absolute_import
+from functools import lru_cache
+
+import numpy as np
+
+from gomoku_board import DIRECTIONS, SCALE, GomokuBoard, combine, geometry
+
+
+@lru_cache(maxsize=None)
+def line_tables(side):
+    """
+    Builds the NumPy tables for the geometry of a board, once for each side.
+
+    Args:
+        side:   size of the square's side for the board.
+
+    Returns:
+        A tuple with the indices of the intersections of every line, padded
+        at both ends with the index one past the last intersection; the
+        direction of each line; the n-uple factors indexed by length; and,
+        for each intersection and direction, the line through it and its
+        column in the padded row of that line.
+    """
+    geo = geometry(side)
+    padded = np.full((len(geo.lines), side + 2), side * side, np.intp)
+    for i, line in enumerate(geo.lines):
+        padded[i, 1 : len(line) + 1] = line
+
+    factors = np.array([0] + [geo.factors[i] for i in sorted(geo.factors)])
+    return (
+        padded,
+        np.array(geo.directions),
+        factors,
+        np.array(geo.cell_lines),
+        np.array(geo.cell_slots) + 1,
+    )
+
+
+class NumpyBoard(GomokuBoard):
+    """GomokuBoard whose evaluation is vectorized with NumPy."""
+
+    def __init__(self, side, check=False, radius=1):
+        """
+        Inits NumpyBoard with the attributes of a GomokuBoard, along with the
+        tables of indices for every line, shared by boards of the same side.
+
+        Args:
+            side:   size of the square's side for the board.
+            check:  compares every evaluation against a full recomputation,
+                    for debugging purposes.
+            radius: how far from the stones, along each direction, an empty
+                    intersection is still a candidate move.
+        """
+        super().__init__(side, check, radius)
+        (
+            self.padded,
+            self.line_direction,
+            self.factor_table,
+            self.cell_line_table,
+            self.cell_slot_table,
+        ) = line_tables(side)
+
+    def rescore(self):
+        """
+        Takes a NumPy view of the intersections, since there are no line
+        scores to keep.
+        """
+        self.grid = np.frombuffer(self.cells, dtype=np.int8)
+
+    def update_lines(self, index):
+        """
+        Does nothing: the lines are scored when the board is evaluated.
+
+        Args:
+            index:  position of the intersection in the flat array.
+        """
+
+    def score_rows(self, rows):
+        """
+        Scores many padded lines at once, for both players.
+
+        Args:
+            rows:   matrix with a padded line on each row.
+
+        Returns:
+            Dictionary mapping each player to a tuple with the score of
+            each line, in millionths, and whether it is one move away from
+            a victory. Lines without a score are either winning or have no
+            more stones of a color than of the other.
+        """
+        flat = rows.ravel()
+        width = rows.shape[1]
+        live = np.where(rows == 2, 0, rows).sum(axis=1) != 0
+
+        scored = {}
+        for player in (1, -1):
+            mine = flat == player
+            starts = np.flatnonzero(mine[1:] & ~mine[:-1]) + 1
+            ends = np.flatnonzero(mine[:-1] & ~mine[1:])
+            lengths = ends - starts + 1
+            line = starts // width
+
+            sides = (flat[starts - 1] == 0) & (flat[ends + 1] == 0)
+            won = (lengths >= 4) & sides
+            gaps = (
+                (starts[1:] == ends[:-1] + 2)
+                & (flat[ends[:-1] + 1] == 0)
+                & (lengths[:-1] + lengths[1:] >= 4)
+            )
+
+            scores = np.bincount(
+                line,
+                weights=self.factor_table[np.minimum(lengths, 4)]
+                * np.where(sides, 1 / 2, 0.1),
+                minlength=len(rows),
+            )
+            winning = np.zeros(len(rows), bool)
+            winning[line[won]] = True
+            winning[line[1:][gaps]] = True
+            winning &= live
+
+            points = np.where(winning | ~live, 0, np.rint(scores * SCALE))
+            scored[player] = (points.astype(np.int64), winning)
+
+        return scored
+
+    def line_totals(self):
+        """
+        Scores every line of the board for both players.
+
+        Returns:
+            A tuple with the totals and winning lines for each player and
+            direction, as kept by GomokuBoard, and the scores of every line
+            as returned by `score_rows`.
+        """
+        scored = self.score_rows(np.append(self.grid, 2)[self.padded])
+        totals, wins = {}, {}
+
+        for player, (points, winning) in scored.items():
+            totals[player] = [
+                int(i)
+                for i in np.bincount(
+                    self.line_direction,
+                    weights=points,
+                    minlength=len(DIRECTIONS),
+                )
+            ]
+            wins[player] = np.bincount(
+                self.line_direction[winning], minlength=len(DIRECTIONS)
+            ).tolist()
+
+        return totals, wins, scored
+
+    def evaluate(self, player):
+        """
+        Calculates the same 'score' as `GomokuBoard.evaluate`, scoring all
+        lines of the board at once.
+
+        Args:
+            player: a integer representing a player.
+
+        Returns:
+            An integer that takes in account the groupings of stones
+            with the same color, representing their contribution to
+            a possible victory.
+        """
+        self.totals, self.wins, _ = self.line_totals()
+        return super().evaluate(player)
+
+    def evaluate_batch(self, moves, player):
+        """
+        Calculates what `evaluate` would return after each of many moves,
+        without playing them. The board is scored once, and the four lines
+        through every move, with the move placed on them, are all scored
+        together in a single pass.
+
+        Args:
+            moves:  list of coordinates of empty intersections.
+            player: a integer representing the player placing the stones,
+                    and whose point of view is taken.
+
+        Returns:
+            List with the scores, in the same order as the moves.
+        """
+        if not moves:
+            return []
+
+        totals, wins, scored = self.line_totals()
+        indices = np.array([x * self.side + y for x, y in moves])
+        line_ids = self.cell_line_table[indices]
+        slots = self.cell_slot_table[indices]
+
+        rows = np.append(self.grid, 2)[self.padded[line_ids]]
+        moved, direction = np.indices(line_ids.shape)
+        rows[moved, direction, slots] = player
+        changed = self.score_rows(rows.reshape(-1, rows.shape[-1]))
+
+        after = {}
+        for who in (1, -1):
+            points, winning = scored[who]
+            new_points, new_winning = changed[who]
+            after[who] = (
+                np.array(totals[who])
+                - points[line_ids]
+                + new_points.reshape(line_ids.shape),
+                np.array(wins[who])
+                - winning[line_ids]
+                + new_winning.reshape(line_ids.shape),
+            )
+
+        return [
+            combine(
+                {i: j[0][k].tolist() for i, j in after.items()},
+                {i: j[1][k].tolist() for i, j in after.items()},
+                player,
+            )
+            for k in range(len(moves))
+        ]
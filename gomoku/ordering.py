@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""ordering.py
+
+Alpha-beta prunes the most when the best move of a node is searched first.
+Moves are sorted by a few cheap guesses of how good they are, in order:
+
+    * the best move stored for the position by an earlier search;
+    * threats: winning on the spot, blocking the opponent's four, making an
+        open four and blocking or making an open three;
+    * killer moves [1], which caused a cutoff in a sibling node at the same
+        depth, and are often good regardless of the move before them;
+    * the history heuristic [2], which counts how often (and how deep) a
+        move caused cutoffs anywhere in the tree;
+    * how many stones of both colors are around the move.
+
+Ties are broken by the coordinates, or by a fixed random permutation of
+them if a seed is given, so that searches are always reproducible.
+
+[1] https://www.chessprogramming.org/Killer_Heuristic
+[2] https://www.chessprogramming.org/History_Heuristic
+"""
+
+from __future__ import absolute_import
+from random import Random
+
+# threat classes for a move, from the most to the least urgent
+FIVE, BLOCK_FOUR, OPEN_FOUR, BLOCK_THREE, OPEN_THREE, QUIET = range(6)
+
+
+def threat_class(board, position, player):
+    """
+    Classifies a move by the threats it makes or stops along any direction.
+
+    Args:
+        board:      a GomokuBoard object.
+        position:   the board matrix's coordinates of an empty intersection.
+        player:     a integer representing the player to move.
+
+    Returns:
+        A tuple with the threat class (lower is more urgent) and the number
+        of stones of both players lined up with the move.
+    """
+    attack = board.runs_through(position, player)
+    defense = board.runs_through(position, -player)
+    urgency, stones = QUIET, 0
+
+    for (own, own_ends), (other, other_ends) in zip(attack, defense):
+        if own >= 5:
+            urgency = FIVE
+        elif other >= 5:
+            urgency = min(urgency, BLOCK_FOUR)
+        elif own == 4 and own_ends == 2:
+            urgency = min(urgency, OPEN_FOUR)
+        elif other == 4 and other_ends == 2:
+            urgency = min(urgency, BLOCK_THREE)
+        elif own == 3 and own_ends == 2:
+            urgency = min(urgency, OPEN_THREE)
+        stones += own + other - 2
+
+    return urgency, stones
+
+
+class MoveOrdering:
+    """Sorts the moves of a node, learning from the cutoffs of a search."""
+
+    def __init__(self, seed=None, killers=2):
+        """
+        Inits MoveOrdering with empty killer and history tables.
+
+        Args:
+            seed:       breaks ties with a random permutation drawn from this
+                        seed, or by coordinates if None.
+            killers:    how many killer moves are kept for each depth.
+        """
+        self.killers = {}
+        self.history = {}
+        self.slots = killers
+        self.rng = Random(seed) if seed is not None else None
+        self.noise = {}
+
+    def tiebreak(self, position):
+        """
+        Gives a fixed random rank for a position, drawn the first time it is
+        asked for.
+
+        Args:
+            position:   the board matrix's coordinates of an intersection.
+
+        Returns:
+            A float, or zero if there is no seed.
+        """
+        if self.rng is None:
+            return 0
+        if position not in self.noise:
+            self.noise[position] = self.rng.random()
+        return self.noise[position]
+
+    def order(self, board, moves, player, depth, hash_move=None):
+        """
+        Sorts the moves of a node, from the most promising to the least.
+
+        Args:
+            board:      a GomokuBoard object.
+            moves:      list of coordinates of empty intersections.
+            player:     a integer representing the player to move.
+            depth:      remaining depth of the search at the node.
+            hash_move:  best move stored for the position, if any.
+
+        Returns:
+            A new list with the same moves.
+        """
+        killers = self.killers.get(depth, ())
+
+        def key(move):
+            urgency, stones = threat_class(board, move, player)
+            return (
+                move != hash_move,
+                urgency,
+                move not in killers,
+                -self.history.get(move, 0),
+                -stones,
+                self.tiebreak(move),
+                move,
+            )
+
+        return sorted(moves, key=key)
+
+    def cutoff(self, move, depth):
+        """
+        Learns from a move that was good enough to prune the rest of a node.
+
+        Args:
+            move:   the board matrix's coordinates of the move.
+            depth:  remaining depth of the search at the node.
+        """
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.slots :]
+
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def clear(self):
+        """Forgets the killers and the history of previous searches."""
+        self.killers.clear()
+        self.history.clear()
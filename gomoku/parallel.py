@@ -0,0 +1,327 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""parallel.py
+
+Splits the moves at the root of the search among a pool of processes. The
+first, most promising move is searched locally before anything else, as in
+the "Young Brothers Wait" concept [1], so that the other moves start from a
+good bound. Only as many moves as there are workers are handed out at a
+time, each one with the best bound known when it is handed out; a move
+that does not beat that bound is only known to be no better than it.
+
+The score and the move found are the same as those of a serial
+`ab_pruning` at the same depth: when a move that was cut off might tie
+with the best one and comes before it, it is searched again with a full
+window to decide which of them the serial search would have kept.
+
+The workers run the same kind of search as the local part, alpha-beta or
+principal variation search, and probe the saved file of the opening book,
+if there is one; entries learned since it was saved are only seen by the
+local part. Each worker counts what it does, and the counts are added to
+the statistics of the whole search.
+
+[1] https://www.chessprogramming.org/Young_Brothers_Wait_Concept
+"""
+
+from __future__ import absolute_import
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from book import OpeningBook
+from gomoku_board import VICTORY
+from minimax import SearchTimeout, ab_pruning
+from negamax import PVSearch
+from ordering import MoveOrdering
+from stats import SearchStats
+from transposition import EXACT
+
+# boards kept by each worker process, one for each kind, side and radius
+BOARDS = {}
+
+# books kept by each worker process, with the time their file was written
+BOOKS = {}
+
+
+def search_root_move(
+    kind,
+    side,
+    radius,
+    matrix,
+    player,
+    move,
+    depth,
+    window,
+    end,
+    pvs=False,
+    book=None,
+    profile=None,
+):
+    """
+    Searches a single move of the root inside a worker process.
+
+    Args:
+        kind:   class of the board, GomokuBoard or one of its subclasses.
+        side:   size of the square's side for the board.
+        radius: distance from the stones within which moves are searched.
+        matrix: the matrix representation for the board at the root.
+        player: a integer representing the player to move at the root.
+        move:   the board matrix's coordinates of the root move.
+        depth:  depth of the search at the root.
+        window: tuple with the alpha and beta bounds for the move.
+        end:    deadline for the search, as given by `time.time`, or None.
+        pvs:    whether to run a principal variation search instead of
+                `ab_pruning`.
+        book:   the saved opening book to probe, as given by `book_file`,
+                or None.
+        profile:    whether the search is profiled, as in SearchStats, or
+                    None if it is not counted.
+
+    Returns:
+        A tuple with the score of the move, as returned by `ab_pruning`,
+        and the SearchStats of the search, or None.
+    """
+    if (kind, side, radius) not in BOARDS:
+        BOARDS[kind, side, radius] = kind(side, radius=radius)
+
+    board = BOARDS[kind, side, radius]
+    board.board = matrix
+    board.make_move(player, move)
+
+    if book is not None:
+        path, stamp, options = book
+        if BOOKS.get(path, (None,))[0] != stamp:
+            if path in BOOKS:
+                BOOKS[path][1].close()
+            BOOKS[path] = (stamp, OpeningBook(path=path, **options))
+        book = BOOKS[path][1]
+
+    stats = None if profile is None else SearchStats(profile)
+    search = PVSearch(aspiration=0) if pvs else ab_pruning
+    alpha, beta = window
+    score = search(
+        board,
+        depth - 1,
+        alpha,
+        beta,
+        -player,
+        None,
+        end,
+        MoveOrdering(),
+        book,
+        stats,
+    )[0]
+    return score, stats
+
+
+def book_file(book):
+    """
+    Describes the saved file of an opening book, for the workers to open.
+
+    Args:
+        book:   an OpeningBook, or None.
+
+    Returns:
+        A tuple with the path of the file, the time it was written and the
+        arguments the book was made with, or None if there is no file.
+    """
+    if book is None or book.path is None or not os.path.exists(book.path):
+        return None
+    options = dict(
+        side=book.side, max_stones=book.max_stones, min_depth=book.min_depth
+    )
+    return book.path, os.stat(book.path).st_mtime_ns, options
+
+
+class ParallelSearch:
+    """Pool of processes that search the moves at the root of a tree."""
+
+    def __init__(self, workers):
+        """
+        Inits ParallelSearch with a pool of worker processes.
+
+        Args:
+            workers:    number of processes searching at the same time.
+        """
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes, waiting for them to finish."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def search(
+        self,
+        board,
+        depth,
+        player,
+        table=None,
+        deadline=None,
+        ordering=None,
+        book=None,
+        stats=None,
+        search=ab_pruning,
+    ):
+        """
+        Searches the board to a given depth, with a full window.
+
+        Args:
+            board:      a GomokuBoard object.
+            depth:      maximum depth before end of recursion.
+            player:     a integer representing the player to move.
+            table:      a TranspositionTable for the local part of the
+                        search, or None.
+            deadline:   time, as given by `time.time`, after which the
+                        search is abandoned by raising SearchTimeout.
+            ordering:   a MoveOrdering for the local part of the search and
+                        the root moves, or None.
+            book:       an OpeningBook for the local part of the search,
+                        whose saved file the workers probe, or None.
+            stats:      a SearchStats to which what the local part and the
+                        workers do is added, or None.
+            search:     the search of the local part, `ab_pruning` or a
+                        `negamax.PVSearch`, which the workers run as well.
+
+        Returns:
+            A tuple containing the score for the board, and the best move
+            evaluated by the algorithm.
+        """
+        inf = float("inf")
+        if depth == 0:
+            return search(
+                board, depth, -inf, inf, player, table, None, None, book, stats
+            )
+
+        kind = type(board)
+        if stats is not None:
+            board, ordering = stats.enter(board, ordering, depth)
+
+        entry = None
+        if table is not None:
+            entry = table.probe(board.zobrist_key(player))
+            if stats is not None:
+                stats.probed(entry, depth)
+            if entry and entry.depth >= depth and entry.bound == EXACT:
+                return entry.score, entry.move
+
+        ordering = MoveOrdering() if ordering is None else ordering
+        moves = ordering.order(
+            board,
+            board.candidate_moves(),
+            player,
+            depth,
+            entry.move if entry is not None else None,
+        )
+
+        for move in moves:
+            board.make_move(player, move)
+            won = board.victory()
+            board.undo_move()
+            if won:
+                return -player * VICTORY, move
+
+        board.make_move(player, moves[0])
+        best = search(
+            board,
+            depth - 1,
+            -inf,
+            inf,
+            -player,
+            table,
+            deadline,
+            ordering,
+            book,
+            stats,
+        )[0]
+        board.undo_move()
+
+        # score of each move, and the bound it was searched with (if any)
+        results = {0: (best, None)}
+        pending, remaining = {}, iter(range(1, len(moves)))
+        matrix, sign = board.board, -player
+        pvs, saved = isinstance(search, PVSearch), book_file(book)
+        profile = None if stats is None else stats.profile
+
+        def submit(index):
+            window = (best, inf) if player == -1 else (-inf, best)
+            future = self.executor.submit(
+                search_root_move,
+                kind,
+                board.side,
+                board.radius,
+                matrix,
+                player,
+                moves[index],
+                depth,
+                window,
+                deadline,
+                pvs,
+                saved,
+                profile,
+            )
+            pending[future] = (index, best)
+
+        for index in islice(remaining, self.workers):
+            submit(index)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, bound = pending.pop(future)
+                try:
+                    score, counted = future.result()
+                except SearchTimeout:
+                    for other in pending:
+                        other.cancel()
+                    raise
+                if stats is not None:
+                    stats.merge(counted)
+
+                if sign * score > sign * bound:
+                    results[index] = (score, None)
+                    best = max(best, score, key=lambda i: sign * i)
+                else:
+                    results[index] = (score, bound)
+
+                for following in islice(remaining, 1):
+                    submit(following)
+
+        first = min(
+            i
+            for i, (score, bound) in results.items()
+            if bound is None and score == best
+        )
+        for index in range(first):
+            # cut off exactly at the best score: a tie or a worse move
+            if results[index][0] == best:
+                board.make_move(player, moves[index])
+                score = search(
+                    board,
+                    depth - 1,
+                    -inf,
+                    inf,
+                    -player,
+                    None,
+                    deadline,
+                    MoveOrdering(),
+                    book,
+                    stats,
+                )[0]
+                board.undo_move()
+                if score == best:
+                    first = index
+                    break
+
+        if table is not None:
+            table.store(
+                board.zobrist_key(player), depth, EXACT, best, moves[first]
+            )
+
+        return best, moves[first]
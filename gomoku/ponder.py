@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""ponder.py
+
+Searching on the opponent's time [1]: while a human thinks over their move,
+a background thread searches the position they are expected to leave, that
+is, after the reply found in the principal variation of the computer's last
+search. If they do play it, the result of that search is answered with at
+once, or the search goes on from the transposition table it filled; if
+not, whatever it stored about positions that are still reachable is
+reused. Without an expected reply, the thread searches the opponent's
+options, which fills the table all the same.
+
+The thread only runs while the main one waits for input, which releases
+the interpreter lock, and on a copy of the board; it is stopped, and waited
+for, before the main thread searches again with the same table.
+
+[1] https://www.chessprogramming.org/Pondering
+"""
+
+from __future__ import absolute_import
+from threading import Thread
+from time import time
+
+from minimax import ab_pruning, iterative_deepening
+from ordering import MoveOrdering
+
+
+class Deadline:
+    """
+    End of a search that may be brought forward by another thread. It is
+    compared with times as the number of seconds it stands for, so that the
+    search takes it in place of one.
+    """
+
+    def __init__(self, end=float("inf")):
+        """
+        Inits Deadline.
+
+        Args:
+            end:    time, as given by `time.time`, at which it passes.
+        """
+        self.end = end
+        self.stopped = False
+
+    def stop(self):
+        """Makes the deadline pass at once."""
+        self.stopped = True
+
+    def __lt__(self, now):
+        return self.stopped or self.end < now
+
+    def __le__(self, now):
+        return self.stopped or self.end <= now
+
+    def __gt__(self, now):
+        return not self.stopped and self.end > now
+
+    def __ge__(self, now):
+        return not self.stopped and self.end >= now
+
+
+class Ponder:
+    """Background search while the opponent is thinking."""
+
+    def __init__(
+        self, board, player, table, guess=None, max_depth=None, search=None
+    ):
+        """
+        Inits Ponder with a copy of the board, without starting it.
+
+        Args:
+            board:      a GomokuBoard object, with the opponent to move.
+            player:     a integer representing the player who ponders.
+            table:      the TranspositionTable of the player, filled by the
+                        background search.
+            guess:      the board matrix's coordinates of the expected reply
+                        of the opponent, or None.
+            max_depth:  deepest search to try, or None to go on until
+                        stopped.
+            search:     the search run at each depth, as in
+                        `minimax.iterative_deepening`; `ab_pruning` if None.
+        """
+        self.board = type(board)(board.side, radius=board.radius)
+        for index in board.history:
+            self.board.make_move(board.cells[index], divmod(index, board.side))
+
+        self.player = player
+        self.table = table
+        self.guess = guess
+        self.max_depth = max_depth
+        self.search = ab_pruning if search is None else search
+        self.deadline = Deadline()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.result = None
+        self.start = self.seconds = 0.0
+
+    def run(self):
+        """Searches until stopped, in the background thread."""
+        board, player = self.board, -self.player
+        if self.guess is not None:
+            board.make_move(player, self.guess)
+            player = self.player
+        if board.victory() or board.cells.count(0) < 2:
+            return
+
+        try:
+            self.result = iterative_deepening(
+                board,
+                player,
+                float("inf"),
+                self.table,
+                self.max_depth,
+                MoveOrdering(),
+                search=self.search,
+                deadline=self.deadline,
+            )
+        except SystemExit:
+            pass
+
+    def begin(self):
+        """Starts searching in the background."""
+        self.start = time()
+        self.thread.start()
+
+    def finish(self, move):
+        """
+        Stops searching, once the opponent has played.
+
+        Args:
+            move:   the board matrix's coordinates of the opponent's move.
+
+        Returns:
+            A tuple with the score, the best move and the depth found for
+            the position after the move, as returned by `iterative_deepening`,
+            if it was the expected one; None otherwise.
+        """
+        self.deadline.stop()
+        self.thread.join()
+        self.seconds = time() - self.start
+        if self.guess is None or move != self.guess:
+            return None
+        return self.result
@@ -0,0 +1,228 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""selfplay.py
+
+Plays many games between two engines without a terminal, spread over a pool
+of processes, and records every move with what its search took: nodes
+visited, nodes per second, time, depth and effective branching factor,
+along with the winner of each game (1, -1, or 0 for a draw). Games open
+with a few random moves around the center, drawn from a seed, so that they
+differ from each other and can be replayed.
+
+    $ python selfplay.py --games 8 --workers 4 --output games.csv
+"""
+
+from __future__ import absolute_import
+import csv
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from time import time
+
+from engine import Engine, notation
+
+WINNERS = {1: "black", -1: "white", 0: "draw"}
+
+# columns of the CSV file, with a row for each move
+FIELDS = (
+    "game",
+    "ply",
+    "player",
+    "move",
+    "score",
+    "depth",
+    "nodes",
+    "seconds",
+    "nps",
+    "branching",
+    "winner",
+)
+
+
+def play_game(number, options, opening=2, seed=0):
+    """
+    Plays a whole game between two engines with the same options, each one
+    keeping its own transposition table.
+
+    Args:
+        number:     number of the game, which also picks its opening.
+        options:    dictionary with the keyword arguments of both Engines.
+        opening:    how many random moves are played after the first one,
+                    on the center.
+        seed:       seed of the random openings, along with the number.
+
+    Returns:
+        A tuple with a dictionary describing the game, and a list with one
+        for each move searched by the engines.
+    """
+    rng = Random(seed * 2 ** 20 + number)
+    engines = {i: Engine(**options) for i in (1, -1)}
+    side = engines[1].board.side
+    player, ply, moves = 1, 0, []
+    start = time()
+
+    def play(position):
+        for engine in engines.values():
+            engine.play(player, position)
+
+    play((side // 2, side // 2))
+    while ply < opening and not engines[1].over():
+        player, ply = -player, ply + 1
+        play(rng.choice(engines[1].board.candidate_moves()))
+
+    while not engines[1].over():
+        player, ply = -player, ply + 1
+        decision = engines[player].think(player)
+        play(decision.move)
+        moves.append(
+            dict(
+                game=number,
+                ply=ply,
+                player=player,
+                move=notation(decision.move),
+                score=decision.score,
+                depth=decision.depth,
+                nodes=decision.nodes,
+                seconds=round(decision.seconds, 6),
+                nps=round(decision.nps, 1),
+                branching=round(decision.branching, 3),
+            )
+        )
+
+    game = dict(
+        game=number,
+        winner=engines[1].board.winner,
+        plies=ply + 1,
+        seconds=round(time() - start, 3),
+    )
+    for move in moves:
+        move["winner"] = game["winner"]
+    return game, moves
+
+
+def write_results(path, games, moves):
+    """
+    Saves the games and their moves, as JSON if the path ends in ".json",
+    or as CSV, with a row for each move, otherwise.
+
+    Args:
+        path:   file to write to.
+        games:  list of dictionaries, as returned by `play_game`.
+        moves:  list of dictionaries, as returned by `play_game`.
+    """
+    with open(path, "w", newline="") as output:
+        if path.endswith(".json"):
+            json.dump(dict(games=games, moves=moves), output, indent=1)
+        else:
+            writer = csv.DictWriter(output, FIELDS)
+            writer.writeheader()
+            writer.writerows(moves)
+
+
+def summary(games, moves):
+    """
+    Sums up the results of a run.
+
+    Args:
+        games:  list of dictionaries, as returned by `play_game`.
+        moves:  list of dictionaries, as returned by `play_game`.
+
+    Returns:
+        A string with the results and averages of the searches.
+    """
+    results = {}
+    for game in games:
+        results[game["winner"]] = results.get(game["winner"], 0) + 1
+
+    nodes = sum(i["nodes"] for i in moves)
+    seconds = sum(i["seconds"] for i in moves)
+    return "{} games ({}), {} moves, {:.3f} s/move, {:.0f} nodes/s".format(
+        len(games),
+        ", ".join(
+            "{}: {}".format(WINNERS[i], j) for i, j in sorted(results.items())
+        ),
+        len(moves),
+        seconds / max(1, len(moves)),
+        nodes / seconds if seconds else 0,
+    )
+
+
+def parse_args():
+    """
+    Reads the command line options.
+
+    Returns:
+        An argparse.Namespace with the options.
+    """
+    parser = ArgumentParser(description="Games of Gomoku between AIs.")
+    parser.add_argument("--games", type=int, default=4, help="games to play")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes playing games at the same time",
+    )
+    parser.add_argument(
+        "--output",
+        default="selfplay.csv",
+        help="file for the results, in JSON if it ends in .json, else CSV",
+    )
+    parser.add_argument(
+        "--think-ms",
+        type=int,
+        default=200,
+        help="time each move may take, in milliseconds",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="deepest search for each move, which makes games repeatable "
+        "when given with a large --think-ms",
+    )
+    parser.add_argument(
+        "--side", type=int, default=15, help="size of the board's side"
+    )
+    parser.add_argument(
+        "--backend", choices=("python", "numpy"), default="python"
+    )
+    parser.add_argument(
+        "--opening",
+        type=int,
+        default=2,
+        help="random moves played after the first one",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the random openings"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Plays the games and writes down their results."""
+    args = parse_args()
+    options = dict(
+        side=args.side,
+        backend=args.backend,
+        think_ms=args.think_ms,
+        max_depth=args.max_depth,
+    )
+
+    games, moves = [], []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(play_game, i, options, args.opening, args.seed)
+            for i in range(args.games)
+        ]
+        for future in futures:
+            game, game_moves = future.result()
+            games.append(game)
+            moves += game_moves
+
+    write_results(args.output, games, moves)
+    print(summary(games, moves))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""server.py
+
+Plays many games at once over TCP, one for each connection, speaking a line
+protocol modeled on the one of Gomocup [1]. Coordinates are written "x,y",
+counted from zero, with x the column and y the row. The commands are:
+
+    START size      starts a game on an empty board, answering OK
+    RESTART         starts the game again on the same board, answering OK
+    INFO key value  sets timeout_turn (milliseconds) or max_depth
+    BEGIN           asks for the first move of the game, answering x,y
+    TURN x,y        plays a move of the opponent, answering with one
+    BOARD           followed by lines "x,y,who" (1 for the server's stones,
+                    2 for the opponent's) and DONE, sets up a position and
+                    answers with a move
+    ABOUT           answers with the name of the engine
+    END             closes the connection
+
+Anything else is answered with UNKNOWN, and a command that cannot be carried
+out, such as a move on a stone, with ERROR and the reason.
+
+Each connection is a session that keeps its own board, on which the moves
+are checked. Searches are run by a pool of worker processes, so that a long
+search does not hold up the other sessions: each search goes to whichever
+worker is free, along with the transposition table and move ordering of its
+session, which come back with the move and are kept by the session until it
+ends.
+
+    $ python server.py --port 5005 --workers 4
+    $ python client.py --port 5005 --clients 8
+
+[1] https://plastovicka.github.io/protocl2en.htm
+"""
+
+from __future__ import absolute_import
+import asyncio
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+
+from engine import Engine
+from gomoku_board import GomokuBoard
+
+ABOUT = 'name="multivac", version="1.0", country="Brazil"'
+
+# engines kept by each worker process, one for each set of options, whose
+# table and move ordering are those of the session being searched
+ENGINES = {}
+
+
+def worker_think(options, moves, player, state=None):
+    """
+    Searches for a move of a session inside a worker process.
+
+    Args:
+        options:    dictionary with the keyword arguments of its Engine.
+        moves:      list of (player, position) tuples, with every stone on
+                    the board, in the order they were placed.
+        player:     a integer representing the player to move.
+        state:      what the session kept from its last search, as returned
+                    by this function, or None.
+
+    Returns:
+        A tuple with the Decision of the engine and the state of the
+        session after it: its transposition table and move ordering, along
+        with the moves and options they were searched with.
+    """
+    # the limits of the search may change without losing the table
+    options = dict(options)
+    limits = {i: options.pop(i, None) for i in ("think_ms", "max_depth")}
+    key = tuple(sorted(options.items()))
+    if key not in ENGINES:
+        ENGINES[key] = Engine(max_depth=1, **options)
+    engine = ENGINES[key]
+    engine.board.clear()
+    engine.think_ms, engine.max_depth = limits["think_ms"], limits["max_depth"]
+
+    table, ordering, played, used = state or (None, None, [], None)
+    if table is None or used != options or moves[: len(played)] != played:
+        table, ordering = engine.table, engine.ordering
+        table.clear()
+        ordering.clear()
+    engine.table, engine.ordering = table, ordering
+
+    for stone, position in moves:
+        engine.play(stone, position)
+    return engine.think(player), (table, ordering, list(moves), options)
+
+
+class WorkerPool:
+    """Worker processes, any of which searches for any session."""
+
+    def __init__(self, workers):
+        """
+        Inits WorkerPool with its processes.
+
+        Args:
+            workers:    number of processes searching at the same time.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    async def think(self, options, moves, player, state):
+        """
+        Searches for a move of a session in the first worker that is free.
+
+        Args:
+            options:    as in `worker_think`.
+            moves:      as in `worker_think`.
+            player:     as in `worker_think`.
+            state:      as in `worker_think`.
+
+        Returns:
+            A tuple with the Decision of the engine and the new state of the
+            session, as in `worker_think`.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, worker_think, options, moves, player, state
+        )
+
+    def close(self):
+        """Stops the worker processes, waiting for them to finish."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ProtocolError(Exception):
+    """Raised by a command that cannot be carried out."""
+
+
+class Session:
+    """A game played over a connection."""
+
+    def __init__(self, number, pool, options):
+        """
+        Inits Session without a board, which START creates.
+
+        Args:
+            number:     number of the session, unique in the server.
+            pool:       the WorkerPool that searches for the session.
+            options:    dictionary with the keyword arguments of its Engine,
+                        whose side is set by START.
+        """
+        self.number = number
+        self.pool = pool
+        self.options = dict(options)
+        self.board = None
+        self.moves = []
+
+        # the transposition table and move ordering of the last search
+        self.state = None
+
+    def parse(self, text):
+        """
+        Reads a position written as "x,y".
+
+        Args:
+            text:   the position, as received.
+
+        Returns:
+            The board matrix's coordinates.
+
+        Raises:
+            ProtocolError: if the text is not a position on the board.
+        """
+        try:
+            x, y = (int(i) for i in text.split(","))
+        except ValueError:
+            raise ProtocolError("bad coordinates " + text) from None
+        if not (0 <= x < self.board.side and 0 <= y < self.board.side):
+            raise ProtocolError("outside the board " + text)
+        return y, x
+
+    def place(self, player, position):
+        """
+        Places a stone on the board of the session.
+
+        Args:
+            player:     a integer representing the player.
+            position:   the board matrix's coordinates for the play.
+
+        Raises:
+            ProtocolError: if the game is over or the intersection is not an
+                           empty one.
+        """
+        if self.board.victory() or self.board.draw():
+            raise ProtocolError("the game is over")
+        if not self.board.is_empty_space(position):
+            raise ProtocolError("{1},{0} is not free".format(*position))
+        self.board.place_stone(player, position)
+        self.moves.append((player, position))
+
+    async def reply(self, player):
+        """
+        Searches for a move and plays it.
+
+        Args:
+            player:     a integer representing the player to move.
+
+        Returns:
+            The move, written as "x,y".
+        """
+        if self.board.victory() or self.board.draw():
+            raise ProtocolError("the game is over")
+        if self.moves:
+            decision, self.state = await self.pool.think(
+                self.options, self.moves, player, self.state
+            )
+            move = decision.move
+        else:
+            # every first move looks the same to the search: take the center
+            move = (self.board.side // 2, self.board.side // 2)
+        self.place(player, move)
+        return "{1},{0}".format(*move)
+
+    async def command(self, line, stones=()):
+        """
+        Carries out a command.
+
+        Args:
+            line:   the command, with its arguments.
+            stones: the lines that followed BOARD, up to DONE.
+
+        Returns:
+            The answer to the command, or None if it has none.
+
+        Raises:
+            ProtocolError: if the command cannot be carried out.
+        """
+        words = line.split()
+        name, args = words[0].upper(), words[1:]
+
+        if name == "ABOUT":
+            return ABOUT
+        if name == "INFO":
+            if len(args) == 2 and args[0].lower() == "timeout_turn":
+                self.options["think_ms"] = max(1, int(args[1]))
+            elif len(args) == 2 and args[0].lower() == "max_depth":
+                self.options["max_depth"] = max(1, int(args[1]))
+            return None
+        if name == "START":
+            side = int(args[0]) if args else 15
+            if not 5 <= side <= 26:
+                raise ProtocolError("unsupported size {}".format(side))
+            self.options["side"] = side
+            self.board = GomokuBoard(side)
+            self.moves = []
+            return "OK"
+        if name not in ("RESTART", "BEGIN", "TURN", "BOARD"):
+            return "UNKNOWN " + name
+        if self.board is None:
+            raise ProtocolError("no game, START first")
+
+        if name == "RESTART":
+            self.board.clear()
+            self.moves = []
+            return "OK"
+        if name == "BEGIN":
+            if self.moves:
+                raise ProtocolError("the game has begun")
+            return await self.reply(1)
+        if name == "TURN":
+            if not args:
+                raise ProtocolError("TURN needs a move")
+            player = -1 if len(self.moves) % 2 else 1
+            self.place(player, self.parse(args[0]))
+            return await self.reply(-player)
+
+        # BOARD: stones of the player to move are the server's own
+        self.board.clear()
+        self.moves = []
+        own = -1 if len(stones) % 2 else 1
+        for stone in stones:
+            position, _, who = stone.rpartition(",")
+            if who not in ("1", "2"):
+                raise ProtocolError("bad stone " + stone)
+            self.place(own if who == "1" else -own, self.parse(position))
+        return await self.reply(own)
+
+
+async def serve(reader, writer, pool, options, numbers):
+    """
+    Plays a session with a client until it ends or the connection is lost.
+
+    Args:
+        reader:     the asyncio.StreamReader of the connection.
+        writer:     the asyncio.StreamWriter of the connection.
+        pool:       the WorkerPool that searches for the sessions.
+        options:    dictionary with the keyword arguments of each Engine.
+        numbers:    iterator over the numbers of the sessions.
+    """
+    session = Session(next(numbers), pool, options)
+    try:
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                if reader.at_eof():
+                    break
+                continue
+            if line.upper() == "END":
+                break
+
+            stones = []
+            if line.upper() == "BOARD":
+                while True:
+                    stone = (await reader.readline()).decode().strip()
+                    if stone.upper() == "DONE" or reader.at_eof():
+                        break
+                    stones.append(stone)
+
+            try:
+                answer = await session.command(line, stones)
+            except (ProtocolError, ValueError) as error:
+                answer = "ERROR {}".format(error)
+            if answer is not None:
+                writer.write(answer.encode() + b"\r\n")
+                await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_server(host, port, workers, options):
+    """
+    Accepts connections until interrupted.
+
+    Args:
+        host:       address to listen on.
+        port:       port to listen on.
+        workers:    number of worker processes.
+        options:    dictionary with the keyword arguments of each Engine.
+    """
+    pool = WorkerPool(workers)
+    numbers = count()
+    try:
+        server = await asyncio.start_server(
+            lambda reader, writer: serve(
+                reader, writer, pool, options, numbers
+            ),
+            host,
+            port,
+        )
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main():
+    """Starts the server with the command line options."""
+    parser = ArgumentParser(description="Gomoku engine over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument(
+        "--workers", type=int, default=2, help="processes searching moves"
+    )
+    parser.add_argument(
+        "--think-ms",
+        type=int,
+        default=500,
+        help="time each move may take, in milliseconds, unless the client "
+        "sets timeout_turn",
+    )
+    parser.add_argument(
+        "--table-mb",
+        type=int,
+        default=16,
+        help="memory for the transposition table of each session",
+    )
+    parser.add_argument(
+        "--backend", choices=("python", "numpy"), default="python"
+    )
+    parser.add_argument(
+        "--search", choices=("alphabeta", "pvs"), default="alphabeta"
+    )
+    args = parser.parse_args()
+
+    options = dict(
+        backend=args.backend,
+        think_ms=args.think_ms,
+        table_mb=args.table_mb,
+        search=args.search,
+    )
+    try:
+        asyncio.run(run_server(args.host, args.port, args.workers, options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""stats.py
+
+Counters filled in by the search when it is given a SearchStats object:
+nodes visited at each remaining depth, cutoffs and the position of the
+move that caused them in its node, and how often the transposition table
+had the position, and could answer it. Without one, the search only pays
+for checking that there is none.
+
+When profiling, the search also goes through stand-ins for the board and
+the move ordering that time every call to the methods that evaluate the
+board, check for victories and generate and sort the moves. The stand-ins
+are slower than the objects they stand for, so the nodes per second of a
+profiled search are not those of a normal one, but the share of the time
+taken by each method is close.
+"""
+
+from __future__ import absolute_import
+from collections import namedtuple
+from time import perf_counter
+from types import GeneratorType
+
+# methods of each object whose calls are timed when profiling
+BOARD_CALLS = (
+    "candidate_moves",
+    "evaluate",
+    "evaluate_batch",
+    "make_move",
+    "undo_move",
+    "victory",
+)
+ORDERING_CALLS = ("order",)
+
+Iteration = namedtuple("Iteration", "depth score move nodes seconds")
+
+
+class Profiled:  # pylint: disable=R0903
+    """Stands for an object, timing the calls to some of its methods."""
+
+    def __init__(self, target, stats, names):
+        """
+        Inits Profiled with the object it stands for.
+
+        Args:
+            target: the object whose methods are called.
+            stats:  the SearchStats that keeps the timings.
+            names:  names of the methods to time.
+        """
+        self.target = target
+        self.stats = stats
+        self.names = names
+
+    def __getattr__(self, name):
+        value = getattr(self.target, name)
+        if name not in self.names:
+            return value
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            result = value(*args, **kwargs)
+            if isinstance(result, GeneratorType):
+                return self.stats.timed_items(name, result)
+            self.stats.add_time(name, perf_counter() - start)
+            return result
+
+        return timed
+
+
+class SearchStats:
+    """What a search, or a series of searches, went through."""
+
+    def __init__(self, profile=False, callback=None):
+        """
+        Inits SearchStats with every counter at zero.
+
+        Args:
+            profile:    whether the calls to the board and the move ordering
+                        are timed.
+            callback:   function called with this object and an Iteration
+                        whenever iterative deepening completes a depth, or
+                        None.
+        """
+        self.profile = profile
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """Sets every counter back to zero."""
+        self.nodes = 0
+        self.depths = {}
+        self.cutoffs = {}
+        self.probes = self.hits = self.usable = 0
+        self.calls = {}
+        self.seconds = {}
+        self.iterations = []
+        self.start = perf_counter()
+
+    def enter(self, board, ordering, depth):
+        """
+        Counts a node of the search, and puts the stand-ins in place of the
+        board and the move ordering if profiling.
+
+        Args:
+            board:      a GomokuBoard object, or its stand-in.
+            ordering:   a MoveOrdering, its stand-in, or None.
+            depth:      remaining depth of the search at the node.
+
+        Returns:
+            A tuple with the board and the move ordering the search should
+            go on with.
+        """
+        self.nodes += 1
+        self.depths[depth] = self.depths.get(depth, 0) + 1
+        if self.profile and not isinstance(board, Profiled):
+            board = Profiled(board, self, BOARD_CALLS)
+            if ordering is not None:
+                ordering = Profiled(ordering, self, ORDERING_CALLS)
+        return board, ordering
+
+    def leaf(self):
+        """Counts a leaf scored along with its siblings."""
+        self.nodes += 1
+        self.depths[0] = self.depths.get(0, 0) + 1
+
+    def probed(self, entry, depth):
+        """
+        Counts a lookup in the transposition table.
+
+        Args:
+            entry:  the Entry found, or None.
+            depth:  remaining depth of the search at the node.
+        """
+        self.probes += 1
+        if entry is not None:
+            self.hits += 1
+            self.usable += entry.depth >= depth
+
+    def cutoff(self, index):
+        """
+        Counts a node whose remaining moves were pruned.
+
+        Args:
+            index:  position of the move that caused it in the node's list.
+        """
+        self.cutoffs[index] = self.cutoffs.get(index, 0) + 1
+
+    def add_time(self, name, seconds):
+        """
+        Counts a call to a method.
+
+        Args:
+            name:       name of the method.
+            seconds:    time it took.
+        """
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def timed_items(self, name, items):
+        """
+        Times the generation of each item of a generator, as a call.
+
+        Args:
+            name:   name of the method that returned the generator.
+            items:  the generator.
+
+        Yields:
+            The items of the generator.
+        """
+        while True:
+            start = perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            self.add_time(name, perf_counter() - start)
+            yield item
+
+    def merge(self, other):
+        """
+        Adds the counters of a search run elsewhere, such as in a worker
+        process, to these ones.
+
+        Args:
+            other:  the SearchStats of that search.
+        """
+        self.nodes += other.nodes
+        self.probes += other.probes
+        self.hits += other.hits
+        self.usable += other.usable
+        for mine, theirs in (
+            (self.depths, other.depths),
+            (self.cutoffs, other.cutoffs),
+            (self.calls, other.calls),
+            (self.seconds, other.seconds),
+        ):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+
+    def iteration(self, depth, score, move):
+        """
+        Notes that iterative deepening has completed a depth.
+
+        Args:
+            depth:  depth of the search.
+            score:  score found by the search.
+            move:   best move found by the search.
+        """
+        info = Iteration(
+            depth, score, move, self.nodes, perf_counter() - self.start
+        )
+        self.iterations.append(info)
+        if self.callback is not None:
+            self.callback(self, info)
+
+    def report(self):
+        """
+        Sums up the counters.
+
+        Returns:
+            A string with a line for each kind of counter.
+        """
+        elapsed = perf_counter() - self.start
+        cutoffs = sum(self.cutoffs.values())
+        lines = [
+            "nodes: {} in {:.3f} s ({:.0f}/s)".format(
+                self.nodes, elapsed, self.nodes / elapsed if elapsed else 0
+            ),
+            "nodes by depth: "
+            + ", ".join(
+                "{}: {}".format(i, self.depths[i])
+                for i in sorted(self.depths, reverse=True)
+            ),
+            "cutoffs: {}, {:.1%} on the first move; by move: {}".format(
+                cutoffs,
+                self.cutoffs.get(0, 0) / cutoffs if cutoffs else 0,
+                ", ".join(
+                    "{}: {}".format(i, self.cutoffs[i])
+                    for i in sorted(self.cutoffs)
+                ),
+            ),
+            "table: {} probes, {:.1%} hits, {:.1%} deep enough".format(
+                self.probes,
+                self.hits / self.probes if self.probes else 0,
+                self.usable / self.probes if self.probes else 0,
+            ),
+        ]
+        for name in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            lines.append(
+                "{}: {} calls, {:.3f} s ({:.1%})".format(
+                    name,
+                    self.calls[name],
+                    self.seconds[name],
+                    self.seconds[name] / elapsed if elapsed else 0,
+                )
+            )
+        return "\n".join(lines)
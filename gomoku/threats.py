@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""threats.py
+
+Threat-space search [1] looks for forced victories by playing only the
+moves that the opponent must answer: fours, which threaten to make five on
+the next move, and open threes, which threaten to make an open four. Since
+the opponent has a single answer to a four, and only a few to a three, the
+tree is narrow, and sequences many moves deep are found in a fraction of
+the time a full-width search would take to reach them.
+
+A victory by continuous fours (VCF) uses fours alone; a victory by
+continuous threats (VCT) also uses threes, whose answers include any four
+of the opponent, as those have to be answered before the threat can be
+carried out.
+
+Threats are found by matching patterns against the text of every line of
+the board, with a byte for each intersection:
+
+    * five intersections with four stones of a player and an empty one
+        make five if it is filled;
+    * five intersections with three stones and two empty ones make a four
+        if either of them is filled;
+    * six intersections whose ends are empty and whose four middle ones hold
+        three stones make an open three, stopped by playing on either end or
+        on the empty middle one; with two stones, filling either of the
+        empty middle ones makes an open three.
+
+[1] L. V. Allis, H. J. van den Herik, M. P. H. Huntjens. "Go-Moku and
+    Threat-Space Search". Computational Intelligence, 12(1), 1996.
+"""
+
+from __future__ import absolute_import
+import re
+from collections import namedtuple
+from functools import lru_cache
+from itertools import combinations
+from time import time
+
+from gomoku_board import geometry
+
+Threats = namedtuple("Threats", "fives fours threes defenses")
+
+# lines are joined into a single text, with this byte between them
+SEPARATOR = b"\x02"
+
+# swaps the bytes of the stones, so that player -1 owns those of player 1
+SWAP = bytes.maketrans(b"\x01\xff", b"\xff\x01")
+
+
+def runs(length, stones):
+    """
+    Builds a pattern for any run of empty intersections and stones of a
+    player, given the number of each.
+
+    Args:
+        length: number of intersections in the run.
+        stones: how many of them hold a stone.
+
+    Returns:
+        A bytes pattern that matches any of the runs.
+    """
+    return b"|".join(
+        re.escape(bytes(int(i in chosen) for i in range(length)))
+        for chosen in combinations(range(length), stones)
+    )
+
+
+FIVE = re.compile(b"(?=(" + runs(5, 4) + b"))")
+FOUR = re.compile(b"(?=(" + runs(5, 3) + b"))")
+THREE = re.compile(b"(?=(\x00(?:" + runs(4, 2) + b")\x00))")
+OPEN_THREE = re.compile(b"(?=(\x00(?:" + runs(4, 3) + b")\x00))")
+
+
+@lru_cache(maxsize=None)
+def line_slices(side):
+    """
+    Finds the lines of a board long enough to hold five stones, as slices of
+    the flat array of intersections, once for each side.
+
+    Args:
+        side:   size of the square's side for the board.
+
+    Returns:
+        A tuple with the list of slices, and the index of the intersection
+        for each byte of the lines joined by SEPARATOR (None for the
+        separators).
+    """
+    slices, offsets = [], []
+    for line in geometry(side).lines:
+        if len(line) >= 5:
+            slices.append(slice(line[0], line[-1] + 1, line[1] - line[0]))
+            offsets += line + [None]
+    return slices, offsets
+
+
+def find_threats(flat, side, player):
+    """
+    Looks for the threats that a player has, or may make, on a board.
+
+    Args:
+        flat:   the intersections of the board, as the bytes of its flat
+                array.
+        side:   size of the square's side for the board.
+        player: a integer representing a player.
+
+    Returns:
+        A Threats tuple with the intersections, as indices into the flat
+        array, that make five, make a four and make an open three for the
+        player; and the intersections that stop every open three the player
+        already has, or None if there are none.
+    """
+    slices, offsets = line_slices(side)
+    if player == -1:
+        flat = flat.translate(SWAP)
+    text = SEPARATOR.join([flat[i] for i in slices])
+
+    def empty(pattern, inner=False):
+        for match in pattern.finditer(text):
+            run = match.group(1)
+            yield match.start(), [
+                offsets[match.start() + i]
+                for i in range(inner, len(run) - inner)
+                if not run[i]
+            ]
+
+    fives = {i[0] for _, i in empty(FIVE)}
+    fours = {j for _, i in empty(FOUR) for j in i}
+    threes = {j for _, i in empty(THREE, True) for j in i}
+
+    defenses = None
+    for start, (middle,) in empty(OPEN_THREE, True):
+        stops = {offsets[start], offsets[start + 5], middle}
+        defenses = stops if defenses is None else defenses & stops
+
+    return Threats(fives, fours, threes, defenses)
+
+
+class ThreatSearch:
+    """Depth-first search for forced victories over threats alone."""
+
+    def __init__(self, board, threes=True, deadline=None):
+        """
+        Inits ThreatSearch with a copy of the intersections of a board, on
+        which stones are placed without scoring them, and an empty cache of
+        failed attacks.
+
+        Args:
+            board:      a GomokuBoard object, left untouched.
+            threes:     whether open threes are tried (VCT), or only fours
+                        (VCF).
+            deadline:   time, as given by `time.time`, after which the search
+                        gives up.
+        """
+        self.side = board.side
+        self.flat = bytearray(board.cells.tobytes())
+        self.keys, self.hash = board.keys, board.hash
+        self.threes = threes
+        self.deadline = deadline
+        self.failed = {}
+        self.nodes = 0
+
+    def play(self, player, index):
+        """
+        Places a stone, or takes it back if it is already there.
+
+        Args:
+            player: a integer representing a player.
+            index:  position of the intersection in the flat array.
+        """
+        self.flat[index] = 0 if self.flat[index] else player & 0xFF
+        self.hash ^= self.keys[player][index]
+
+    def threats(self, player):
+        """
+        Looks for the threats of a player, as in `find_threats`.
+
+        Args:
+            player: a integer representing a player.
+
+        Returns:
+            A Threats tuple.
+        """
+        return find_threats(self.flat, self.side, player)
+
+    def attack(self, player, depth):
+        """
+        Tries every threat of the attacker, who is to move.
+
+        Args:
+            player: a integer representing the attacker.
+            depth:  how many more threats the attacker may make.
+
+        Returns:
+            List of the moves of a winning sequence, as indices into the
+            flat array, alternating between the attacker and the answer of
+            the defender; or None if there is none.
+        """
+        own = self.threats(player)
+        if own.fives:
+            return [min(own.fives)]
+
+        other = self.threats(-player)
+        if len(other.fives) > 1 or depth == 0:
+            return None
+
+        key = self.hash
+        if self.failed.get(key, -1) >= depth:
+            return None
+        if self.deadline is not None and time() > self.deadline:
+            return None
+        self.nodes += 1
+
+        if other.fives:
+            moves = sorted(other.fives)
+        else:
+            moves = sorted(own.fours)
+            if self.threes:
+                moves += sorted(own.threes - own.fours)
+
+        for move in moves:
+            self.play(player, move)
+            line = self.defend(player, depth)
+            self.play(player, move)
+            if line is not None:
+                return [move] + line
+
+        self.failed[key] = depth
+        return None
+
+    def defend(self, player, depth):
+        """
+        Tries every answer of the defender to the threats of the attacker.
+
+        Args:
+            player: a integer representing the attacker.
+            depth:  how many threats the attacker could still make, the one
+                    just played included.
+
+        Returns:
+            List of the moves of a winning sequence, starting with the answer
+            of the defender, or None if the defender escapes.
+        """
+        own = self.threats(player)
+        other = self.threats(-player)
+        if other.fives:
+            return None
+        if len(own.fives) > 1:
+            return []
+
+        if own.fives:
+            answers = own.fives
+        elif own.defenses is not None:
+            answers = own.defenses | other.fours
+        else:
+            return None
+
+        line = []
+        for answer in sorted(answers):
+            self.play(-player, answer)
+            following = self.attack(player, depth - 1)
+            self.play(-player, answer)
+            if following is None:
+                return None
+            if not line:
+                line = [answer] + following
+
+        return line
+
+
+def forced_win(board, player, vcf_depth=10, vct_depth=3, deadline=None):
+    """
+    Looks for a victory by continuous fours, and then for a shorter one by
+    continuous threats, whose tree is much wider, of the player to move.
+
+    Args:
+        board:      a GomokuBoard object, left untouched.
+        player:     a integer representing the player to move.
+        vcf_depth:  how many fours the player may make in a row.
+        vct_depth:  how many threats the player may make in a row, when
+                    threes are also tried; zero skips that search.
+        deadline:   time, as given by `time.time`, after which the search
+                    gives up.
+
+    Returns:
+        List with the board matrix's coordinates of a winning sequence,
+        alternating between the player and the answers of the opponent, or
+        None if none was found.
+    """
+    line = ThreatSearch(board, False, deadline).attack(player, vcf_depth)
+    if line is None and vct_depth:
+        line = ThreatSearch(board, True, deadline).attack(player, vct_depth)
+    if line is None:
+        return None
+    return [divmod(i, board.side) for i in line]
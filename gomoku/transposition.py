@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""transposition.py
+
+Different move orders often lead to the same set of stones on the board, a
+transposition. A transposition table remembers what the search has already
+found out about each position, keyed by its Zobrist hash, so that it needs
+not be searched again [1].
+
+Alpha-beta does not always find the exact score of a node: if the search is
+cut off, the score is only a lower bound for the player who maximizes, and
+if no move was good enough, it is only an upper bound. Each entry keeps
+which of these cases it is.
+
+[1] https://www.chessprogramming.org/Transposition_Table
+"""
+
+from __future__ import absolute_import
+from collections import namedtuple
+
+EXACT, LOWER, UPPER = range(3)
+
+# rough size in bytes of an entry, counting the tuple and the objects in it
+ENTRY_SIZE = 256
+
+Entry = namedtuple("Entry", "key depth bound score move generation")
+
+
+class TranspositionTable:
+    """Fixed number of slots, each holding what is known about a position."""
+
+    def __init__(self, budget=2 ** 26):
+        """
+        Inits TranspositionTable with as many slots as fit in the budget.
+
+        Args:
+            budget: approximate amount of memory, in bytes, that the table
+                    may use when full.
+        """
+        self.size = max(1, budget // ENTRY_SIZE)
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def __len__(self):
+        """Counts the occupied slots."""
+        return sum(1 for i in self.slots if i is not None)
+
+    def new_search(self):
+        """
+        Marks the entries stored so far as belonging to an older search, so
+        that they give way to new ones regardless of their depth.
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        Args:
+            key:    the position's Zobrist hash.
+
+        Returns:
+            The Entry stored for the position, or None if there is none.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Saves what the search found out about a position. A slot holding
+        another position is only replaced if that entry comes from an older
+        search, or if it was searched to a smaller depth (depth-preferred
+        replacement with aging).
+
+        Args:
+            key:    the position's Zobrist hash.
+            depth:  how many plies were searched below the position.
+            bound:  EXACT, LOWER or UPPER, for how the score should be read.
+            score:  the score returned by the search.
+            move:   best move found, or None if none was better than the
+                    bounds.
+        """
+        index = key % self.size
+        old = self.slots[index]
+        if (
+            old is None
+            or old.generation != self.generation
+            or depth >= old.depth
+        ):
+            self.slots[index] = Entry(
+                key, depth, bound, score, move, self.generation
+            )
+
+    def clear(self):
+        """Forgets every position."""
+        self.slots = [None] * self.size
+        self.generation = 0